@@ -0,0 +1,485 @@
+import re
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from functools import cached_property
+from db import read_frame
+from backends import SQLITE
+from config import (
+    TABLE_NAME, DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD, DETAIL_PAGE_SIZE
+)
+
+# Nome da coluna de utilização calculada (mantido igual ao usado nos gráficos)
+UTILIZATION_FIELD = 'UTILIZACAO'
+
+# Somas e contagens do agrupamento fino (dia, hora, máquina, linha) devolvido pelo banco
+GROUP_SUMS = [
+    'registros',
+    'pecas_entrada', 'pecas_saida',
+    'ef_entrada_soma', 'ef_entrada_n',
+    'ef_saida_soma', 'ef_saida_n',
+    'utilizacao_soma', 'utilizacao_n'
+]
+
+# Utilização por registro; NULLIF evita divisão por zero (o registro é ignorado na média)
+UTILIZATION_EXPR = (
+    f"{OPERATION_TIME_FIELD} * 100.0 / "
+    f"NULLIF({OPERATION_TIME_FIELD} + {IDLE_TIME_FIELD}, 0)"
+)
+
+# Eficiência média do registro (entrada e saída), usada no filtro de eficiência
+EFFICIENCY_EXPR = f"({EFFICIENCY_IN_FIELD} + {EFFICIENCY_OUT_FIELD}) / 2.0"
+
+# Faixas dos filtros de eficiência e utilização (%): baixa < 50 <= média <= 80 < alta
+BAND_LOW_LIMIT = 50
+BAND_HIGH_LIMIT = 80
+BAND_CODES = {'low': 0, 'medium': 1, 'high': 2}
+NO_BAND = -1  # Valor nulo (sem eficiência ou sem tempo de máquina)
+
+# Faixa pré-calculada por registro (armazenamento colunar e snapshot)
+EFFICIENCY_BAND_FIELD = 'FAIXA_EFICIENCIA'
+UTILIZATION_BAND_FIELD = 'FAIXA_UTILIZACAO'
+
+# Chaves de tempo no SQLite: dia (YYYY-MM-DD) e hora do dia (a partir do campo HORA, HH:MM:SS)
+DAY_EXPR = SQLITE.day_expr(DATE_FIELD)
+HOUR_EXPR = SQLITE.hour_expr(TIME_FIELD)
+
+
+def aggregate_columns(backend=SQLITE):
+    """Somas e contagens na mesma ordem de GROUP_SUMS"""
+    total = backend.sum_expr
+    return f"""COUNT(*) AS registros,
+               {total(PIECES_IN_FIELD)} AS pecas_entrada,
+               {total(PIECES_OUT_FIELD)} AS pecas_saida,
+               {total(EFFICIENCY_IN_FIELD)} AS ef_entrada_soma,
+               COUNT({EFFICIENCY_IN_FIELD}) AS ef_entrada_n,
+               {total(EFFICIENCY_OUT_FIELD)} AS ef_saida_soma,
+               COUNT({EFFICIENCY_OUT_FIELD}) AS ef_saida_n,
+               {total(UTILIZATION_EXPR)} AS utilizacao_soma,
+               COUNT({UTILIZATION_EXPR}) AS utilizacao_n"""
+
+
+AGGREGATE_COLUMNS = aggregate_columns(SQLITE)
+
+
+def band_codes(values):
+    """Código da faixa de cada valor (mesmos limites dos filtros de build_conditions); NO_BAND para NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.select(
+        [values > BAND_HIGH_LIMIT, values >= BAND_LOW_LIMIT, values < BAND_LOW_LIMIT],
+        [BAND_CODES['high'], BAND_CODES['medium'], BAND_CODES['low']],
+        NO_BAND
+    ).astype(np.int8)
+
+
+def efficiency_values(efficiency_in, efficiency_out):
+    """Eficiência média de cada registro (como EFFICIENCY_EXPR)"""
+    return (np.asarray(efficiency_in, dtype=np.float64) + np.asarray(efficiency_out, dtype=np.float64)) / 2.0
+
+
+def utilization_values(operation, idle):
+    """Utilização (%) de cada registro (como UTILIZATION_EXPR); NaN sem tempo de máquina"""
+    operation = np.asarray(operation, dtype=np.float64)
+    total_time = operation + np.asarray(idle, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total_time != 0, operation * 100.0 / total_time, np.nan)
+
+
+@dataclass(frozen=True)
+class DashboardFilters:
+    """Filtros selecionados no dashboard"""
+    start_date: str = None
+    end_date: str = None
+    machine: str = 'all'
+    client: str = 'all'
+    efficiency: str = 'all'
+    utilization: str = 'all'
+
+
+def build_conditions(filters, date_column=DATE_FIELD, placeholder='?'):
+    """Monta a cláusula WHERE e os parâmetros correspondentes aos filtros
+
+    As faixas de eficiência e utilização viram intervalos sobre os valores
+    calculados de cada registro.
+    """
+    conditions = []
+    params = []
+
+    if filters.start_date and filters.end_date:
+        conditions.append(f"{date_column} BETWEEN {placeholder} AND {placeholder}")
+        params.extend([filters.start_date, filters.end_date])
+
+    if filters.machine and filters.machine != 'all':
+        conditions.append(f"{MACHINE_FIELD} = {placeholder}")
+        params.append(int(filters.machine))
+
+    if filters.client and filters.client != 'all':
+        conditions.append(f"{CLIENT_FIELD} = {placeholder}")
+        params.append(int(filters.client))
+
+    for band, expr in (
+        (filters.efficiency, EFFICIENCY_EXPR),
+        (filters.utilization, UTILIZATION_EXPR),
+    ):
+        if not band or band == 'all':
+            continue
+        if band == 'high':
+            conditions.append(f"{expr} > {placeholder}")
+            params.append(BAND_HIGH_LIMIT)
+        elif band == 'medium':
+            conditions.append(f"{expr} BETWEEN {placeholder} AND {placeholder}")
+            params.extend([BAND_LOW_LIMIT, BAND_HIGH_LIMIT])
+        else:
+            conditions.append(f"{expr} < {placeholder}")
+            params.append(BAND_LOW_LIMIT)
+
+    where = " WHERE " + " AND ".join(conditions) if conditions else ""
+    return where, params
+
+
+def aggregate_query(filters, backend=SQLITE):
+    """Retorna a consulta GROUP BY (dia, hora, máquina, linha) com somas e contagens"""
+    where, params = build_conditions(filters, placeholder=backend.placeholder)
+    day = backend.day_expr(DATE_FIELD)
+    hour = backend.hour_expr(TIME_FIELD)
+    query = f"""
+        SELECT {day} AS dia, {hour} AS hora,
+               {MACHINE_FIELD}, {CLIENT_FIELD},
+               {aggregate_columns(backend)}
+        FROM {TABLE_NAME}{where}
+        GROUP BY {day}, {hour}, {MACHINE_FIELD}, {CLIENT_FIELD}
+    """
+    return query, params
+
+
+def query_aggregates(conn, filters, backend=SQLITE):
+    """Executa a agregação no banco e retorna apenas o resultado agrupado"""
+    query, params = aggregate_query(filters, backend)
+    groups = read_frame(conn, query, params, label=f'agregação {TABLE_NAME}')
+    # Somas como float em todos os bancos (alguns drivers devolvem Decimal ou inteiros)
+    sums = [c for c in GROUP_SUMS if c != 'registros' and not c.endswith('_n')]
+    groups[sums] = groups[sums].astype(float)
+    return DashboardAggregates(groups)
+
+
+# Colunas da tabela de dados detalhados e ordem padrão das linhas
+DETAIL_COLUMNS = [
+    DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+]
+DETAIL_TEXT_COLUMNS = [DATE_FIELD, TIME_FIELD]
+DETAIL_ORDER = [DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD]
+
+# Operadores do filter_query do DataTable e o equivalente em SQL
+FILTER_OPERATORS = {
+    '=': '=', 'eq': '=', '!=': '<>', 'ne': '<>',
+    '>': '>', 'gt': '>', '>=': '>=', 'ge': '>=',
+    '<': '<', 'lt': '<', '<=': '<=', 'le': '<=',
+    'contains': 'contains', 'datestartswith': 'datestartswith'
+}
+# Uma parte do filter_query: {COLUNA} operador valor (o prefixo s/i do operador é ignorado)
+FILTER_PART = re.compile(
+    r"^\{(?P<column>[^}]+)\}\s+[si]?(?P<operator>[<>!]?=|[<>]|eq|ne|gt|ge|lt|le|contains|datestartswith)\s+(?P<value>.+)$"
+)
+
+
+def parse_filter_query(filter_query):
+    """Partes do filter_query do DataTable ("{COLUNA} op valor && ...") como (coluna, operador, valor)
+
+    Partes com colunas fora de DETAIL_COLUMNS, operadores desconhecidos ou
+    valores não numéricos em colunas numéricas são ignoradas.
+    """
+    parts = []
+    for part in (filter_query or '').split(' && '):
+        match = FILTER_PART.match(part.strip())
+        if not match or match['column'] not in DETAIL_COLUMNS:
+            continue
+        column, operator, value = match['column'], FILTER_OPERATORS[match['operator']], match['value'].strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
+        if operator not in ('contains', 'datestartswith') and column not in DETAIL_TEXT_COLUMNS:
+            try:
+                value = float(value)
+            except ValueError:
+                continue
+        parts.append((column, operator, value))
+    return parts
+
+
+def detail_conditions(filters, filter_query=None, backend=SQLITE):
+    """Cláusula WHERE dos filtros do dashboard mais os filtros digitados na tabela"""
+    where, params = build_conditions(filters, placeholder=backend.placeholder)
+    conditions = []
+    for column, operator, value in parse_filter_query(filter_query):
+        if operator in ('contains', 'datestartswith'):
+            # Comparação de texto; a data vai como YYYY-MM-DD em todos os bancos
+            expr = backend.day_expr(column) if column == DATE_FIELD else backend.text_expr(column)
+            conditions.append(f"{expr} LIKE {backend.placeholder}")
+            params.append(f"%{value}%" if operator == 'contains' else f"{value}%")
+        else:
+            conditions.append(f"{column} {operator} {backend.placeholder}")
+            params.append(value)
+    if conditions:
+        where += (" AND " if where else " WHERE ") + " AND ".join(conditions)
+    return where, params
+
+
+def detail_order(sort_by=None):
+    """ORDER BY do sort_by do DataTable, completado pela ordem padrão (DETAIL_ORDER)"""
+    order = []
+    for item in sort_by or []:
+        column = item.get('column_id')
+        if column in DETAIL_COLUMNS and column not in [c for c, _ in order]:
+            order.append((column, 'DESC' if item.get('direction') == 'desc' else 'ASC'))
+    order += [(column, 'ASC') for column in DETAIL_ORDER if column not in [c for c, _ in order]]
+    return ", ".join(f"{column} {direction}" for column, direction in order)
+
+
+def detail_query(filters, page=0, page_size=DETAIL_PAGE_SIZE, sort_by=None, filter_query=None, backend=SQLITE):
+    """Consulta (SQL e parâmetros) de uma página da tabela de dados detalhados"""
+    where, params = detail_conditions(filters, filter_query, backend)
+    return backend.page_query(
+        ', '.join(DETAIL_COLUMNS), f"{TABLE_NAME}{where}", detail_order(sort_by),
+        params, page_size, page * page_size
+    )
+
+
+def query_detail_rows(conn, filters, page=0, page_size=DETAIL_PAGE_SIZE, sort_by=None, filter_query=None,
+                      backend=SQLITE):
+    """Retorna uma página de linhas brutas (só DETAIL_COLUMNS) para a tabela de dados detalhados"""
+    query, params = detail_query(filters, page, page_size, sort_by, filter_query, backend)
+    return read_frame(conn, query, params, label='dados detalhados')
+
+
+def query_detail_count(conn, filters, filter_query=None, backend=SQLITE):
+    """Quantidade de linhas da tabela de dados detalhados (para o número de páginas)"""
+    where, params = detail_conditions(filters, filter_query, backend)
+    count = read_frame(conn, f"SELECT COUNT(*) AS registros FROM {TABLE_NAME}{where}", params,
+                       label='total dos dados detalhados')
+    return int(count['registros'].iloc[0])
+
+
+# Colunas de DADOS necessárias para agregar a partir de um DataFrame
+FRAME_COLUMNS = [
+    DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+]
+
+def _hours(df):
+    """Hora do dia de cada registro, pelos valores distintos de HORA"""
+    time_codes, times = pd.factorize(df[TIME_FIELD], use_na_sentinel=False)
+    hours = pd.to_numeric(pd.Series(times).str.slice(0, 2), errors='coerce').to_numpy()
+    return hours[time_codes]
+
+
+def _group_keys(keys):
+    """Agrupa pelas colunas `keys` de uma vez
+
+    Cada chave vira códigos inteiros (nulos formam um grupo próprio) e as
+    chaves são combinadas em um só código por linha. Retorna o número do
+    grupo de cada linha e os valores de cada chave por grupo.
+    """
+    combined = np.zeros(len(keys[0]), dtype=np.int64)
+    uniques = []
+    for key in keys:
+        codes, values = pd.factorize(key, use_na_sentinel=False)
+        combined = combined * len(values) + codes
+        uniques.append(values)
+    ids, present = pd.factorize(combined)
+    columns = []
+    for values in reversed(uniques):
+        present, codes = np.divmod(present, len(values))
+        columns.append(values.take(codes))
+    return ids, columns[::-1]
+
+
+def _sum_by(ids, n_groups, values):
+    """Soma de `values` por grupo com np.bincount (nulos contam como zero)"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.bincount(ids, weights=np.nan_to_num(values), minlength=n_groups)
+
+
+def aggregate_frame(df):
+    """Agrega um DataFrame de DADOS no mesmo formato da consulta GROUP BY
+
+    `df` deve ter as colunas de FRAME_COLUMNS, com DATA já convertida para datetime.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['dia', 'hora', MACHINE_FIELD, CLIENT_FIELD] + GROUP_SUMS)
+
+    utilization = utilization_values(df[OPERATION_TIME_FIELD], df[IDLE_TIME_FIELD])
+
+    ids, (dia, hora, machine, client) = _group_keys([
+        df[DATE_FIELD], _hours(df), df[MACHINE_FIELD], df[CLIENT_FIELD]
+    ])
+    n_groups = len(dia)
+
+    def count(values):
+        return np.bincount(ids, weights=values, minlength=n_groups).astype(np.int64)
+
+    efficiency_in = df[EFFICIENCY_IN_FIELD].to_numpy(np.float64)
+    efficiency_out = df[EFFICIENCY_OUT_FIELD].to_numpy(np.float64)
+    return pd.DataFrame({
+        'dia': dia.strftime('%Y-%m-%d'),
+        'hora': hora,
+        MACHINE_FIELD: np.asarray(machine),
+        CLIENT_FIELD: np.asarray(client),
+        'registros': np.bincount(ids, minlength=n_groups),
+        'pecas_entrada': _sum_by(ids, n_groups, df[PIECES_IN_FIELD]),
+        'pecas_saida': _sum_by(ids, n_groups, df[PIECES_OUT_FIELD]),
+        'ef_entrada_soma': _sum_by(ids, n_groups, efficiency_in),
+        'ef_entrada_n': count(~np.isnan(efficiency_in)),
+        'ef_saida_soma': _sum_by(ids, n_groups, efficiency_out),
+        'ef_saida_n': count(~np.isnan(efficiency_out)),
+        'utilizacao_soma': _sum_by(ids, n_groups, utilization),
+        'utilizacao_n': count(~np.isnan(utilization))
+    })
+
+
+def combine_aggregates(parts):
+    """Soma agregados parciais (por exemplo, de janelas do período) em um só"""
+    groups = pd.concat([part.groups for part in parts if not part.groups.empty], ignore_index=True)
+    if groups.empty:
+        return parts[0]
+    keys = [c for c in ('dia', 'hora', MACHINE_FIELD, CLIENT_FIELD) if c in groups.columns]
+    groups = groups.groupby(keys, dropna=False, sort=False)[GROUP_SUMS].sum().reset_index()
+    weekday_hour = pd.concat([part.by_weekday_hour for part in parts if not part.groups.empty])
+    weekday_hour = weekday_hour.groupby(['DiaSemana', 'Hora'], sort=False)[PIECES_IN_FIELD].sum().reset_index()
+    return DashboardAggregates(groups, weekday_hour)
+
+
+def _mean(total, count):
+    """Divide somas por contagens, retornando NaN onde não há valores"""
+    return np.divide(total, count, out=np.full(len(total), np.nan), where=count > 0)
+
+
+@dataclass(frozen=True)
+class DashboardRollups:
+    """Recortes consumidos pelos gráficos e KPIs"""
+    totals: dict
+    by_machine: pd.DataFrame
+    by_client: pd.DataFrame
+    by_day: pd.DataFrame
+    by_weekday_hour: pd.DataFrame
+
+
+def compute_rollups(groups, weekday_hour=None):
+    """Calcula todos os recortes em uma passada sobre o agrupamento fino
+
+    Dia, máquina e linha são convertidos uma única vez em códigos inteiros
+    (ordenados, sem nulos, como no groupby do pandas); cada recorte é um
+    np.bincount das colunas de GROUP_SUMS, e as médias saem das somas e
+    contagens.
+    """
+    sums = {column: np.nan_to_num(groups[column].to_numpy(np.float64)) for column in GROUP_SUMS}
+
+    def rollup(key):
+        codes, values = pd.factorize(groups[key], sort=True)
+        valid = codes >= 0
+        if valid.all():
+            valid = slice(None)
+        codes = codes[valid]
+        return values, {
+            column: np.bincount(codes, weights=total[valid], minlength=len(values))
+            for column, total in sums.items()
+        }
+
+    days, day_sums = rollup('dia')
+    machines, machine_sums = rollup(MACHINE_FIELD)
+    clients, client_sums = rollup(CLIENT_FIELD)
+
+    ef_entrada_n = sums['ef_entrada_n'].sum()
+    ef_saida_n = sums['ef_saida_n'].sum()
+    totals = {
+        'pecas_entrada': sums['pecas_entrada'].sum(),
+        'pecas_saida': sums['pecas_saida'].sum(),
+        'ef_entrada': sums['ef_entrada_soma'].sum() / ef_entrada_n if ef_entrada_n else float('nan'),
+        'ef_saida': sums['ef_saida_soma'].sum() / ef_saida_n if ef_saida_n else float('nan'),
+        'dias': len(days)
+    }
+
+    by_machine = pd.DataFrame({
+        MACHINE_FIELD: machines,
+        PIECES_IN_FIELD: machine_sums['pecas_entrada'],
+        EFFICIENCY_IN_FIELD: _mean(machine_sums['ef_entrada_soma'], machine_sums['ef_entrada_n']),
+        UTILIZATION_FIELD: _mean(machine_sums['utilizacao_soma'], machine_sums['utilizacao_n'])
+    })
+    by_client = pd.DataFrame({CLIENT_FIELD: clients, PIECES_IN_FIELD: client_sums['pecas_entrada']})
+    dates = pd.to_datetime(days, format='%Y-%m-%d')
+    by_day = pd.DataFrame({
+        DATE_FIELD: dates,
+        PIECES_IN_FIELD: day_sums['pecas_entrada'],
+        UTILIZATION_FIELD: _mean(day_sums['utilizacao_soma'], day_sums['utilizacao_n'])
+    })
+
+    if weekday_hour is None:
+        # Dia da semana calculado só para os dias distintos
+        names = dates.day_name()
+        name_codes, weekdays = pd.factorize(names, sort=True)
+        day_codes = pd.factorize(groups['dia'], sort=True)[0]
+        hour = groups['hora'].to_numpy(np.float64)
+        valid = (day_codes >= 0) & (hour >= 0) & (hour < 24)
+        keys = name_codes[day_codes[valid]] * 24 + hour[valid].astype(np.int64)
+        size = len(weekdays) * 24
+        present = np.flatnonzero(np.bincount(keys, minlength=size))
+        pieces = np.bincount(keys, weights=sums['pecas_entrada'][valid], minlength=size)
+        weekday_hour = pd.DataFrame({
+            'DiaSemana': weekdays.take(present // 24),
+            'Hora': present % 24,
+            PIECES_IN_FIELD: pieces[present]
+        })
+
+    return DashboardRollups(totals, by_machine, by_client, by_day, weekday_hour)
+
+
+class DashboardAggregates:
+    """Agregados usados pelos gráficos e KPIs, derivados do agrupamento fino
+
+    `groups` precisa ter as colunas dia, máquina, linha e GROUP_SUMS. A coluna
+    hora só é necessária quando `weekday_hour` não é informado.
+    """
+
+    def __init__(self, groups, weekday_hour=None):
+        self.groups = groups
+        self.weekday_hour = weekday_hour
+
+    @property
+    def empty(self):
+        return self.groups.empty or self.groups['registros'].sum() == 0
+
+    @cached_property
+    def rollups(self):
+        """Todos os recortes, calculados juntos na primeira vez que um deles é usado"""
+        return compute_rollups(self.groups, self.weekday_hour)
+
+    @property
+    def totals(self):
+        """KPIs globais do período filtrado"""
+        return self.rollups.totals
+
+    @property
+    def by_machine(self):
+        """Peças, eficiência de entrada e utilização médias por máquina"""
+        return self.rollups.by_machine
+
+    @property
+    def by_client(self):
+        """Peças de entrada por cliente (linha)"""
+        return self.rollups.by_client
+
+    @property
+    def by_day(self):
+        """Peças de entrada e utilização média por dia"""
+        return self.rollups.by_day
+
+    @property
+    def by_weekday_hour(self):
+        """Peças de entrada por dia da semana e hora"""
+        return self.rollups.by_weekday_hour
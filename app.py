@@ -1,27 +1,35 @@
 # Imports
-import os
-import sqlite3
-import pandas as pd
 import numpy as np
 import dash
-from dash import dcc, html, dash_table
+from dash import dcc, html
 from dash.dependencies import Input, Output, State
-import plotly.express as px
-import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
 from datetime import datetime, timedelta
-import gdown
+from dataclasses import asdict
+import json
+import math
 import time
 import traceback
 import socket
 from dash_bootstrap_templates import load_figure_template
+from flask import jsonify
 from flask_login import LoginManager, current_user, login_required
 from users import User, get_user, get_users, get_user_by_email, add_user, edit_user, delete_user
 from login import create_login_layout, validate_login, create_logout
 from settings import create_settings_layout
+from aggregates import DashboardFilters
+from dataset import backend, load_dataset, load_aggregates, load_detail_rows, load_detail_count, fast_source_available
+from datastore import Dataset, DatasetStore, dataset_key
+from streaming import StreamingLoader, should_stream
+from sync import SyncScheduler
+from config import DB_TYPE, SYNC_ENABLED, STREAM_POLL_INTERVAL_MS, DETAIL_PAGE_SIZE
+from cache import create_result_cache
+from payload import PayloadMonitor, compact_figure, figure_update, install_payload_hooks, unchanged_outputs
+from charts import CHART_BUILDERS, empty_figure, kpi_values, detail_table, detail_summary, use_light_template
 
 # Carregar template para os gráficos
 load_figure_template("bootstrap")
+use_light_template()
 
 # Configuração do aplicativo
 app = dash.Dash(
@@ -46,6 +54,34 @@ login_manager.login_view = '/login'
 def load_user(user_id):
     return get_user(user_id)
 
+# Cache dos resultados do dashboard por combinação de filtros
+result_cache = create_result_cache()
+
+# Tamanho e compressão das respostas enviadas ao navegador
+payload_monitor = PayloadMonitor()
+install_payload_hooks(server, payload_monitor)
+
+# Conjuntos de dados filtrados mantidos no servidor e compartilhados pelos callbacks
+dataset_store = DatasetStore(load_dataset, shared_cache=result_cache)
+
+def finish_streaming(job):
+    """Guarda no DatasetStore o conjunto completo de um período carregado em janelas"""
+    dataset = Dataset(job.key, job.filters, job.aggregates, load_detail_rows(job.filters))
+    dataset_store.add(dataset, time.time() - job.started)
+
+# Períodos longos (sem tabelas pré-agregadas) são carregados em janelas, com atualização progressiva
+streaming_loader = StreamingLoader(load_aggregates, finish_streaming)
+
+# Atualização periódica do banco de dados em segundo plano (um agendador por worker).
+# Com o cache compartilhado basta o worker que baixou invalidá-lo; o cache em
+# memória precisa ser invalidado em cada worker. Só se aplica ao arquivo SQLite baixado.
+sync_scheduler = SyncScheduler(
+    on_new_database=result_cache.bump_db_version,
+    on_external_change=None if result_cache.shared else result_cache.bump_db_version
+)
+if SYNC_ENABLED and DB_TYPE == 'sqlite':
+    sync_scheduler.start()
+
 # Layout do aplicativo
 app.layout = html.Div([
     dcc.Location(id='url', refresh=False),
@@ -343,102 +379,6 @@ styles = {
     }
 }
 
-# Configurações do banco de dados
-DB_PATH = 'dstechBD.db'
-TABLE_NAME = 'DADOS'
-DATE_FIELD = 'DATA'
-MACHINE_FIELD = 'MAQUINA'
-CLIENT_FIELD = 'LINHA'
-PIECES_IN_FIELD = 'PECAS_TOT_ENT'
-PIECES_OUT_FIELD = 'PECAS_TOT_SAI'
-EFFICIENCY_IN_FIELD = 'EF_ENTRADA'
-EFFICIENCY_OUT_FIELD = 'EF_SAIDA'
-OPERATION_TIME_FIELD = 'TEMPO_MAQ_LIGADA'
-IDLE_TIME_FIELD = 'TEMPO_MAQ_PARADA'
-
-# ID do arquivo no Google Drive
-GOOGLE_DRIVE_FILE_ID = '1vuJE0AxKhRrdt6gtKQnhp6pbviJvYt2H'
-DOWNLOAD_FREQUENCY = 86400  # 1 dia em segundos
-
-# Função para baixar o banco de dados do Google Drive
-def download_database():
-    """Baixa o banco de dados do Google Drive"""
-    try:
-        print("Verificando banco de dados...")
-        
-        # Verificar se o arquivo já existe e se precisa ser baixado novamente
-        if os.path.exists(DB_PATH):
-            # Verificar a idade do arquivo
-            file_age = time.time() - os.path.getmtime(DB_PATH)
-            
-            if file_age < DOWNLOAD_FREQUENCY:
-                print(f"Usando banco de dados existente: {DB_PATH}")
-                
-                # Verificar integridade do banco
-                if verify_database_integrity():
-                    return True
-                else:
-                    print("Banco de dados corrompido. Baixando novamente...")
-            else:
-                print(f"Banco de dados desatualizado. Baixando novamente...")
-        else:
-            print("Banco de dados não encontrado. Baixando...")
-        
-        # Instalar gdown se necessário
-        try:
-            import gdown
-            print("Biblioteca gdown já está instalada.")
-        except ImportError:
-            print("Instalando biblioteca gdown...")
-            os.system("pip install gdown")
-            import gdown
-        
-        # Baixar o arquivo
-        output = DB_PATH
-        url = f'https://drive.google.com/uc?id={GOOGLE_DRIVE_FILE_ID}'
-        gdown.download(url, output, quiet=False)
-        
-        # Verificar se o download foi bem-sucedido
-        if os.path.exists(DB_PATH):
-            if verify_database_integrity():
-                print(f"Banco de dados baixado com sucesso: {DB_PATH}")
-                return True
-            else:
-                print("Erro: O arquivo baixado não é um banco de dados SQLite válido.")
-                return False
-        else:
-            print("Erro ao baixar o banco de dados.")
-            return False
-    
-    except Exception as e:
-        print(f"Erro ao baixar o banco de dados: {str(e)}")
-        return False
-
-# Função para verificar a integridade do banco de dados
-def verify_database_integrity():
-    """Verifica se o arquivo é um banco de dados SQLite válido"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Verificar se a tabela DADOS existe
-        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='DADOS'")
-        if cursor.fetchone()[0] == 0:
-            conn.close()
-            return False
-        
-        # Verificar se há registros na tabela
-        cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
-        count = cursor.fetchone()[0]
-        print(f"Total de registros na tabela DADOS: {count}")
-        
-        conn.close()
-        print("Verificação de integridade do banco de dados: OK")
-        return True
-    
-    except Exception as e:
-        print(f"Erro ao verificar integridade do banco de dados: {str(e)}")
-        return False
 
 # Layout do dashboard
 def create_dashboard_layout():
@@ -540,6 +480,9 @@ def create_dashboard_layout():
             ], style=styles['filter_item'], className='filter-item')
         ], style=styles['filters_container']),
         
+        # Progresso do carregamento de períodos longos
+        html.Div(id='stream-status', style={'color': '#7f8c8d', 'margin-bottom': '10px'}),
+        
         # KPIs
         html.Div([
             html.Div([
@@ -612,311 +555,229 @@ def create_dashboard_layout():
         # Tabela de dados
         html.Div([
             html.H4("Dados Detalhados", style=styles['card_title']),
-            html.Div(id='data-table', style=styles['data_table'])
+            html.Div(id='data-table-summary', children="Nenhum dado encontrado", style=styles['subtitle']),
+            html.Div(detail_table('detail-table'), id='data-table', style=styles['data_table'])
         ], style=styles['table_container']),
         
         # Store para armazenar o estado dos filtros
         dcc.Store(id='filter-store'),
+        # Progresso do carregamento em janelas (repassa os filtros aos gráficos)
+        dcc.Store(id='stream-store'),
+        # Hash da figura exibida em cada gráfico (permite responder com Patch ou no_update)
+        *[dcc.Store(id=figure_hash_id(chart_id)) for chart_id in CHART_BUILDERS],
+        dcc.Interval(id='stream-interval', interval=STREAM_POLL_INTERVAL_MS, disabled=True),
     ], style=styles['body'])
 
-# Callback para atualizar todos os gráficos e KPIs
+# Callback que registra os filtros e materializa uma única vez os dados filtrados
 @app.callback(
-    [Output('bar-chart', 'figure'),
-     Output('line-chart', 'figure'),
-     Output('pie-chart', 'figure'),
-     Output('comparison-chart', 'figure'),
-     Output('heatmap-chart', 'figure'),
-     Output('kpi-total-pieces', 'children'),
-     Output('kpi-daily-avg', 'children'),
-     Output('kpi-pieces-in', 'children'),
-     Output('kpi-pieces-out', 'children'),
-     Output('data-table', 'children'),
-     Output('efficiency-comparison-chart', 'figure'),
-     Output('utilization-trend-chart', 'figure'),
-     Output('client-performance-chart', 'figure')],
+    Output('filter-store', 'data'),
     [Input('date-range', 'start_date'),
      Input('date-range', 'end_date'),
      Input('machine-dropdown', 'value'),
      Input('client-dropdown', 'value'),
+     Input('efficiency-dropdown', 'value'),
+     Input('utilization-dropdown', 'value'),
      Input('initialization-store', 'data')]
 )
-def update_dashboard(start_date, end_date, selected_machines, selected_clients, _):
-    """Atualiza os gráficos e KPIs com base nos filtros selecionados"""
+def update_filter_store(start_date, end_date, selected_machines, selected_clients,
+                        selected_efficiency, selected_utilization, _):
+    """Materializa os dados dos filtros selecionados, usados por todos os gráficos, KPIs e tabela"""
     print("\n" + "="*80)
     print("ATUALIZANDO GRÁFICOS")
     print("="*80)
     
+    filters = DashboardFilters(
+        start_date, end_date, selected_machines, selected_clients,
+        selected_efficiency or 'all', selected_utilization or 'all'
+    )
+    db_version = result_cache.get_db_version()
+    key = dataset_key(filters, db_version)
+    streaming = False
     try:
-        # Conectar ao banco de dados
-        conn = sqlite3.connect(DB_PATH)
-        
-        # Construir a consulta SQL base
-        query = f"SELECT * FROM {TABLE_NAME}"
-        
-        # Adicionar filtros
-        conditions = []
-        
-        if start_date and end_date:
-            conditions.append(f"{DATE_FIELD} BETWEEN '{start_date}' AND '{end_date}'")
-        
-        if selected_machines and selected_machines != 'all':
-            conditions.append(f"{MACHINE_FIELD} = {selected_machines}")
-        
-        if selected_clients and selected_clients != 'all':
-            conditions.append(f"{CLIENT_FIELD} = {selected_clients}")
-        
-        # Adicionar condições à consulta
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-        
-        # Executar a consulta
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        # Verificar se há dados
-        if df.empty:
-            return empty_charts()
-        
-        # Converter a coluna de data para datetime
-        df['DATA'] = pd.to_datetime(df['DATA'])
-        
-        # Calcular métricas adicionais
-        df['UTILIZACAO'] = df[OPERATION_TIME_FIELD] / (df[OPERATION_TIME_FIELD] + df[IDLE_TIME_FIELD]) * 100
-        
-        # Aplicar filtros de eficiência e utilização
-        if 'high' in df.columns:
-            df = df[df['high'] > 80]
-        elif 'medium' in df.columns:
-            df = df[(df['medium'] >= 50) & (df['medium'] <= 80)]
-        elif 'low' in df.columns:
-            df = df[df['low'] < 50]
-        
-        # Verificar novamente se há dados após os filtros
-        if df.empty:
-            return empty_charts()
-        
-        # Calcular KPIs
-        total_pecas = df[PIECES_IN_FIELD].sum()
-        pecas_entrada = df[PIECES_IN_FIELD].sum()
-        pecas_saida = df[PIECES_OUT_FIELD].sum()
-        dias_unicos = df['DATA'].dt.date.nunique()
-        media_diaria = total_pecas / max(dias_unicos, 1)  # Evitar divisão por zero
-        
-        # Configuração de tema claro para todos os gráficos
-        light_template = dict(
-            layout=dict(
-                paper_bgcolor='#f5f7fa',
-                plot_bgcolor='#f5f7fa',
-                font=dict(color='#2c3e50'),
-                title=dict(font=dict(color='#3498db', size=18)),
-                xaxis=dict(
-                    gridcolor='#cccccc',
-                    zerolinecolor='#cccccc',
-                    title=dict(font=dict(color='#2c3e50')),
-                    tickfont=dict(color='#2c3e50')
-                ),
-                yaxis=dict(
-                    gridcolor='#cccccc',
-                    zerolinecolor='#cccccc',
-                    title=dict(font=dict(color='#2c3e50')),
-                    tickfont=dict(color='#2c3e50')
-                ),
-                legend=dict(font=dict(color='#2c3e50')),
-                margin=dict(t=50, b=50, l=50, r=30)
-            )
-        )
-        
-        # 1. Gráfico de barras - Produção por máquina
-        bar_fig = px.bar(
-            df.groupby(MACHINE_FIELD)[PIECES_IN_FIELD].sum().reset_index(),
-            x=MACHINE_FIELD, y=PIECES_IN_FIELD,
-            title='Produção por Máquina',
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        bar_fig.update_layout(**light_template['layout'])
-        
-        # 2. Gráfico de linha - Tendência de produção
-        line_data = df.groupby(df['DATA'].dt.date)[PIECES_IN_FIELD].sum().reset_index()
-        line_fig = px.line(
-            line_data,
-            x='DATA', y=PIECES_IN_FIELD,
-            title='Tendência de Produção',
-            line_shape='spline',
-            color_discrete_sequence=['#3498db']
-        )
-        line_fig.update_layout(**light_template['layout'])
-        
-        # 3. Gráfico de pizza - Distribuição por cliente
-        # Verificar se há mais de um cliente antes de criar o gráfico de pizza
-        client_data = df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum().reset_index()
-        
-        if len(client_data) > 1:
-            pie_fig = px.pie(
-                client_data,
-                values=PIECES_IN_FIELD,
-                names=CLIENT_FIELD,
-                title='Distribuição por Cliente',
-                color_discrete_sequence=px.colors.qualitative.Bold
-            )
+        if (should_stream(filters) and not fast_source_available(filters)
+                and dataset_store.peek(filters, db_version) is None):
+            # Período longo: carrega em segundo plano e os gráficos acompanham o progresso
+            streaming_loader.start(key, filters, db_version)
+            streaming = True
         else:
-            # Se houver apenas um cliente, criar um gráfico de barras horizontal
-            pie_fig = px.bar(
-                client_data,
-                y=CLIENT_FIELD,
-                x=PIECES_IN_FIELD,
-                title='Produção do Cliente',
-                orientation='h',
-                color_discrete_sequence=['#3498db']
-            )
-            pie_fig.update_layout(yaxis_title='Cliente')
-            
-        pie_fig.update_layout(**light_template['layout'])
-        pie_fig.update_traces(textfont_color='#2c3e50')
-        
-        # 4. Gráfico de comparação - Entrada vs Saída
-        comparison_data = pd.DataFrame({
-            'Tipo': ['Entrada', 'Saída'],
-            'Peças': [pecas_entrada, pecas_saida]
-        })
-        comparison_fig = px.bar(
-            comparison_data,
-            x='Tipo',
-            y='Peças',
-            title='Comparação: Entrada vs Saída',
-            color='Tipo',
-            color_discrete_map={'Entrada': '#3498db', 'Saída': '#2ecc71'}
-        )
-        comparison_fig.update_layout(**light_template['layout'])
-        
-        # Adicionar comparação de eficiência entrada vs saída
-        efficiency_comparison_data = pd.DataFrame({
-            'Tipo': ['Eficiência Entrada', 'Eficiência Saída'],
-            'Valor (%)': [df[EFFICIENCY_IN_FIELD].mean(), df[EFFICIENCY_OUT_FIELD].mean()]
-        })
-        efficiency_fig = px.bar(
-            efficiency_comparison_data,
-            x='Tipo',
-            y='Valor (%)',
-            title='Comparação de Eficiência',
-            color='Tipo',
-            color_discrete_map={'Eficiência Entrada': '#e74c3c', 'Eficiência Saída': '#9b59b6'}
-        )
-        efficiency_fig.update_layout(**light_template['layout'])
-        
-        # Comparação de utilização por máquina
-        utilization_by_machine = df.groupby(MACHINE_FIELD)['UTILIZACAO'].mean().reset_index()
-        utilization_fig = px.bar(
-            utilization_by_machine,
-            x=MACHINE_FIELD,
-            y='UTILIZACAO',
-            title='Utilização por Máquina (%)',
-            color_discrete_sequence=['#9b59b6']
-        )
-        utilization_fig.update_layout(**light_template['layout'])
-        
-        # Comparação de desempenho por cliente
-        client_fig = px.bar(
-            df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum().reset_index(),
-            x=CLIENT_FIELD,
-            y=PIECES_IN_FIELD,
-            title='Desempenho por Cliente',
-            color_discrete_sequence=['#f39c12']
-        )
-        client_fig.update_layout(**light_template['layout'])
-        
-        # 5. Mapa de calor - Produção por dia e hora
-        df['DiaSemana'] = df['DATA'].dt.day_name()
-        df['Hora'] = df['DATA'].dt.hour
-        heatmap_data = df.groupby(['DiaSemana', 'Hora'])[PIECES_IN_FIELD].sum().reset_index()
-        heatmap_fig = px.density_heatmap(
-            heatmap_data,
-            x='Hora',
-            y='DiaSemana',
-            z=PIECES_IN_FIELD,
-            title='Produção por Dia e Hora',
-            color_continuous_scale='Blues'
-        )
-        heatmap_fig.update_layout(**light_template['layout'])
-        
-        # 6. Gráfico de eficiência por máquina
-        efficiency_comparison_fig = px.bar(
-            df.groupby(MACHINE_FIELD)[EFFICIENCY_IN_FIELD].mean().reset_index(),
-            x=MACHINE_FIELD, y=EFFICIENCY_IN_FIELD,
-            title='Eficiência por Máquina',
-            color_discrete_sequence=['#e74c3c']
-        )
-        efficiency_comparison_fig.update_layout(**light_template['layout'])
-        
-        # 7. Gráfico de tendência de utilização
-        utilization_trend_data = df.groupby(df['DATA'].dt.date)['UTILIZACAO'].mean().reset_index()
-        utilization_trend_fig = px.line(
-            utilization_trend_data,
-            x='DATA', y='UTILIZACAO',
-            title='Tendência de Utilização',
-            line_shape='spline',
-            color_discrete_sequence=['#9b59b6']
-        )
-        utilization_trend_fig.update_layout(**light_template['layout'])
-        
-        # 8. Gráfico de desempenho por cliente
-        client_performance_fig = px.bar(
-            df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum().reset_index(),
-            x=CLIENT_FIELD, y=PIECES_IN_FIELD,
-            title='Desempenho por Cliente',
-            color_discrete_sequence=['#f39c12']
-        )
-        client_performance_fig.update_layout(**light_template['layout'])
-        
-        # Tabela de dados
-        table = html.Div([
-            dash_table.DataTable(
-                data=df.head(10).to_dict('records'),
-                columns=[{"name": i, "id": i} for i in df.columns],
-                style_table={'overflowX': 'auto'},
-                style_cell={
-                    'textAlign': 'left',
-                    'backgroundColor': '#ffffff',
-                    'color': '#2c3e50'
-                },
-                style_header={
-                    'backgroundColor': '#f5f7fa',
-                    'fontWeight': 'bold',
-                    'color': '#3498db'
-                }
-            )
-        ])
-        
-        # Formatar KPIs
-        formatted_total = f"{int(total_pecas):,}".replace(',', '.')
-        formatted_avg = f"{int(media_diaria):,}".replace(',', '.')
-        formatted_in = f"{int(pecas_entrada):,}".replace(',', '.')
-        formatted_out = f"{int(pecas_saida):,}".replace(',', '.')
-        
-        return [bar_fig, line_fig, pie_fig, comparison_fig, heatmap_fig, 
-                formatted_total, formatted_avg, formatted_in, formatted_out,
-                table, efficiency_comparison_fig, utilization_trend_fig, client_performance_fig]
-                
+            dataset_store.get_or_create(filters, db_version)
     except Exception as e:
-        print(f"Erro ao atualizar gráficos: {str(e)}")
-        import traceback
+        # Cada gráfico tenta novamente e mostra o erro apenas no próprio componente
+        print(f"Erro ao carregar os dados filtrados: {str(e)}")
         print(traceback.format_exc())
-        return empty_charts()
+    
+    # O navegador recebe apenas o identificador do conjunto, não os dados
+    return {'key': key, 'filters': asdict(filters), 'db_version': db_version, 'streaming': streaming}
 
-# Função para criar gráficos vazios
-def empty_charts():
-    """Retorna gráficos vazios quando não há dados"""
-    empty_fig = go.Figure().add_annotation(
-        text="Nenhum dado encontrado para os filtros selecionados",
-        xref="paper", yref="paper",
-        x=0.5, y=0.5, showarrow=False
-    )
-    # Configurar tema claro para gráficos vazios
-    empty_fig.update_layout(
-        paper_bgcolor='#f5f7fa',
-        plot_bgcolor='#f5f7fa',
-        font=dict(color='#2c3e50')
+# Callback que acompanha o carregamento em janelas e libera os gráficos a cada etapa
+@app.callback(
+    [Output('stream-store', 'data'),
+     Output('stream-interval', 'disabled'),
+     Output('stream-status', 'children')],
+    [Input('filter-store', 'data'),
+     Input('stream-interval', 'n_intervals')],
+    State('stream-store', 'data'),
+    prevent_initial_call=True
+)
+def update_stream_progress(filter_data, _, previous):
+    """Repassa os filtros aos gráficos com o progresso do carregamento"""
+    job = streaming_loader.get(filter_data['key']) if filter_data.get('streaming') else None
+    # Sem carregamento neste worker (ou já concluído): os gráficos usam o conjunto completo
+    if job is None or job.done:
+        return dict(filter_data, janelas=None, concluido=True), True, ""
+    
+    status = f"Carregando período: {job.completed} de {len(job.windows)} partes ({job.progress:.0%})"
+    # Nenhuma janela nova desde a última verificação: não redesenha os gráficos
+    if previous and previous.get('key') == job.key and previous.get('janelas') == job.completed:
+        return dash.no_update, False, status
+    return dict(filter_data, janelas=job.completed, concluido=False), False, status
+
+def get_dataset(filter_data):
+    """Retorna o conjunto de dados materializado no servidor para o identificador do navegador"""
+    filters = DashboardFilters(**filter_data['filters'])
+    return dataset_store.get_or_create(filters, filter_data['db_version'])
+
+def cached_output(name, filter_data, builder):
+    """Monta uma saída do dashboard para o conjunto de dados, reaproveitando o cache de resultados
+
+    Durante o carregamento em janelas, monta a saída com os agregados parciais (sem cache).
+    """
+    if not filter_data.get('concluido', True):
+        job = streaming_loader.get(filter_data['key'])
+        if job is None or job.aggregates is None:
+            return dash.no_update
+        return builder(Dataset(job.key, job.filters, job.aggregates, None))
+    dataset = get_dataset(filter_data)
+    key = ('saida', dataset.key, name)
+    value = result_cache.get(key)
+    if value is None:
+        inicio = time.time()
+        value = builder(dataset)
+        result_cache.set(key, value, time.time() - inicio)
+    return value
+
+def figure_hash_id(chart_id):
+    return f'{chart_id}-hash'
+
+# Um callback por gráfico: são despachados em paralelo e uma falha afeta só o próprio gráfico
+def register_chart_callback(chart_id, chart_builder):
+    @app.callback(
+        [Output(chart_id, 'figure'),
+         Output(figure_hash_id(chart_id), 'data')],
+        Input('stream-store', 'data'),
+        State(figure_hash_id(chart_id), 'data'),
+        prevent_initial_call=True
     )
-    return [empty_fig] * 5 + ["0"] * 4 + [html.Div("Nenhum dado encontrado")] + [empty_fig] * 3
+    def update_chart(filter_data, previous_hash=None):
+        def build(dataset):
+            if dataset.aggregates.empty:
+                return compact_figure(empty_figure())
+            return compact_figure(chart_builder(dataset.aggregates))
+        
+        try:
+            # Só o que mudou em relação à figura exibida é enviado
+            return figure_update(cached_output(chart_id, filter_data, build), previous_hash)
+        except Exception as e:
+            print(f"Erro ao atualizar o gráfico {chart_id}: {str(e)}")
+            print(traceback.format_exc())
+            return compact_figure(empty_figure()), None
+    
+    return update_chart
+
+for chart_id, chart_builder in CHART_BUILDERS.items():
+    register_chart_callback(chart_id, chart_builder)
+
+# Callback para os KPIs
+@app.callback(
+    [Output('kpi-total-pieces', 'children'),
+     Output('kpi-daily-avg', 'children'),
+     Output('kpi-pieces-in', 'children'),
+     Output('kpi-pieces-out', 'children')],
+    Input('stream-store', 'data'),
+    [State('kpi-total-pieces', 'children'),
+     State('kpi-daily-avg', 'children'),
+     State('kpi-pieces-in', 'children'),
+     State('kpi-pieces-out', 'children')],
+    prevent_initial_call=True
+)
+def update_kpis(filter_data, *current):
+    """Atualiza os KPIs com base nos agregados dos filtros (só os valores que mudaram)"""
+    def build(dataset):
+        if dataset.aggregates.empty:
+            return ["0"] * 4
+        return kpi_values(dataset.aggregates)
+    
+    try:
+        return unchanged_outputs(cached_output('kpis', filter_data, build), current)
+    except Exception as e:
+        print(f"Erro ao atualizar KPIs: {str(e)}")
+        print(traceback.format_exc())
+        return ["0"] * 4
+
+# Callback para a tabela de dados detalhados
+@app.callback(
+    [Output('detail-table', 'data'),
+     Output('detail-table', 'page_count'),
+     Output('detail-table', 'page_current'),
+     Output('data-table-summary', 'children')],
+    [Input('stream-store', 'data'),
+     Input('detail-table', 'page_current'),
+     Input('detail-table', 'sort_by'),
+     Input('detail-table', 'filter_query')],
+    State('detail-table', 'page_size'),
+    prevent_initial_call=True
+)
+def update_data_table(filter_data, page_current, sort_by, filter_query, page_size):
+    """Atualiza a página exibida na tabela de dados detalhados
+
+    Cada página é consultada no banco (LIMIT/OFFSET) com a ordenação e os
+    filtros da tabela; a primeira página na ordem padrão já vem com o
+    conjunto de dados.
+    """
+    # A tabela só é montada com o período completo
+    if not filter_data or not filter_data.get('concluido', True):
+        return [dash.no_update] * 4
+    
+    # Mudança de filtros ou de ordenação volta para a primeira página
+    page = (page_current or 0) if 'detail-table.page_current' in dash.ctx.triggered_prop_ids else 0
+    page_size = page_size or DETAIL_PAGE_SIZE
+    sort_by = sort_by or []
+    filter_query = filter_query or ''
+    
+    def build_rows(dataset):
+        if page == 0 and page_size == DETAIL_PAGE_SIZE and not sort_by and not filter_query:
+            rows = dataset.detail_rows
+        else:
+            rows = load_detail_rows(dataset.filters, page, page_size, sort_by, filter_query)
+        return rows.to_dict('records')
+    
+    def build_count(dataset):
+        return load_detail_count(dataset.filters, filter_query)
+    
+    try:
+        view = json.dumps([page, page_size, sort_by, filter_query], sort_keys=True)
+        rows = cached_output(f'tabela {view}', filter_data, build_rows)
+        total = cached_output(f'tabela total {filter_query}', filter_data, build_count)
+        return rows, max(math.ceil(total / page_size), 1), page, detail_summary(total)
+    except Exception as e:
+        print(f"Erro ao atualizar a tabela de dados: {str(e)}")
+        print(traceback.format_exc())
+        return [], 1, 0, "Nenhum dado encontrado"
+
+# Tamanho das respostas dos callbacks (antes e depois da compressão)
+@app.server.route('/payload-stats')
+def serve_payload_stats():
+    return jsonify(payload_monitor.stats())
+
+# Contadores do cache de resultados do dashboard
+@app.server.route('/cache-stats')
+def serve_cache_stats():
+    return jsonify(result_cache.stats())
+
+# Contadores das conexões com o banco de dados (pool, esperas e descartes)
+@app.server.route('/db-stats')
+def serve_db_stats():
+    return jsonify(backend.stats())
 
 # Adicionar media queries para melhorar a responsividade
 @app.server.route('/assets/custom.css')
@@ -1011,9 +872,6 @@ def serve_custom_css():
 
 # Inicializar o aplicativo
 if __name__ == '__main__':
-    # Verificar e baixar o banco de dados se necessário
-    download_database()
-    
     # Encontrar uma porta disponível
     port = 8090
     max_port = 8099
@@ -0,0 +1,373 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import has_request_context, request
+from config import (
+    DB_TYPE, DB_PATH, MYSQL_CONFIG, POSTGRESQL_CONFIG, SQLSERVER_CONFIG,
+    DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_MAX_LIFETIME, DB_POOL_MAX_IDLE,
+    DB_POOL_PRE_PING, DB_POOL_SLOW_ACQUIRE
+)
+from db import read_connection
+
+
+def current_callback():
+    """Callback do Dash que está usando a conexão (pelo output da requisição em andamento)"""
+    if not has_request_context():
+        return None
+    payload = request.get_json(silent=True) or {}
+    return payload.get('output') or request.path
+
+
+class ConnectionPool:
+    """Conjunto de conexões reaproveitadas entre as requisições
+
+    Limita a quantidade de conexões abertas com o servidor; quem chega com
+    todas em uso espera até DB_POOL_TIMEOUT segundos por uma livre. Antes de
+    entregar uma conexão ociosa, confere se ela ainda responde (pre-ping).
+    Conexões mais velhas que DB_POOL_MAX_LIFETIME ou ociosas há mais de
+    DB_POOL_MAX_IDLE segundos são fechadas, ao pegar ou devolver uma conexão
+    e por uma thread que confere as ociosas mesmo sem requisições. Esperas acima de
+    DB_POOL_SLOW_ACQUIRE segundos são registradas com o callback que pediu a
+    conexão.
+    """
+
+    def __init__(self, factory, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 max_lifetime=DB_POOL_MAX_LIFETIME, max_idle=DB_POOL_MAX_IDLE,
+                 pre_ping=DB_POOL_PRE_PING, slow_acquire=DB_POOL_SLOW_ACQUIRE):
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.pre_ping = pre_ping
+        self.slow_acquire = slow_acquire
+        self._idle = []  # (conexão, criada_em, devolvida_em); a mais recente no final
+        self._created = {}
+        self._condition = threading.Condition()
+        self._opened = 0
+        self.acquisitions = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.closed = {'vida_maxima': 0, 'ociosa': 0, 'falha_ping': 0, 'com_erro': 0}
+        self._reaper = None
+        self._reaper_pid = None
+
+    def _start_reaper(self):
+        """Inicia a thread que fecha as conexões ociosas vencidas (uma por processo)
+
+        Chamar com self._condition adquirido.
+        """
+        if self._reaper is not None and self._reaper_pid == os.getpid():
+            return
+        interval = max(min(self.max_idle, self.max_lifetime) / 2, 1)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                with self._condition:
+                    self._reap(time.time())
+
+        self._reaper = threading.Thread(target=run, name='pool-reaper', daemon=True)
+        self._reaper_pid = os.getpid()
+        self._reaper.start()
+
+    def _close(self, conn, reason):
+        """Fecha a conexão e libera a vaga (chamar com self._condition adquirido)"""
+        self._opened -= 1
+        self._created.pop(id(conn), None)
+        self.closed[reason] += 1
+        self._condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _reap(self, now):
+        """Fecha as conexões ociosas há tempo demais ou além da vida máxima"""
+        keep = []
+        for conn, created, returned in self._idle:
+            if now - created > self.max_lifetime:
+                self._close(conn, 'vida_maxima')
+            elif now - returned > self.max_idle:
+                self._close(conn, 'ociosa')
+            else:
+                keep.append((conn, created, returned))
+        self._idle = keep
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _take(self, inicio):
+        """Retira uma conexão ociosa ou reserva a vaga de uma nova (None), esperando até o prazo"""
+        waited = False
+        with self._condition:
+            while True:
+                now = time.time()
+                self._reap(now)
+                if self._idle:
+                    return self._idle.pop()[0], waited
+                if self._opened < self.size:
+                    self._opened += 1
+                    self._start_reaper()
+                    return None, waited
+                remaining = self.timeout - (now - inicio)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise TimeoutError(f"Nenhuma conexão livre após {self.timeout}s (limite de {self.size})")
+                waited = True
+                self._condition.wait(remaining)
+
+    def acquire(self):
+        inicio = time.time()
+        waited = False
+        while True:
+            # O prazo e o tempo de espera contam desde a primeira tentativa
+            conn, waited_now = self._take(inicio)
+            waited = waited or waited_now
+            if conn is None:
+                try:
+                    conn = self.factory()
+                except Exception:
+                    with self._condition:
+                        self._opened -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._created[id(conn)] = time.time()
+                break
+            if not self.pre_ping or self._ping(conn):
+                break
+            # Conexão caiu enquanto estava ociosa: descarta e tenta a próxima (ou abre uma nova)
+            with self._condition:
+                self._close(conn, 'falha_ping')
+
+        elapsed = time.time() - inicio
+        with self._condition:
+            self.acquisitions += 1
+            if waited:
+                self.waits += 1
+            self.wait_seconds += elapsed
+            self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+        if elapsed > self.slow_acquire:
+            print(f"Aviso: espera de {elapsed * 1000:.0f} ms por conexão (callback: {current_callback() or '-'})")
+        return conn
+
+    def release(self, conn, broken=False):
+        with self._condition:
+            self._reap(time.time())
+            created = self._created.get(id(conn), 0)
+            if broken:
+                self._close(conn, 'com_erro')
+            elif time.time() - created > self.max_lifetime:
+                self._close(conn, 'vida_maxima')
+            else:
+                self._idle.append((conn, created, time.time()))
+                self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception:
+            # Desfaz a transação aberta; se nem isso funcionar, a conexão é descartada
+            try:
+                conn.rollback()
+            except Exception:
+                self.release(conn, broken=True)
+                raise
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def stats(self):
+        """Contadores do pool: conexões, esperas e descartes"""
+        with self._condition:
+            return {
+                'abertas': self._opened,
+                'ociosas': len(self._idle),
+                'limite': self.size,
+                'aquisicoes': self.acquisitions,
+                'esperas': self.waits,
+                'espera_media_ms': round(self.wait_seconds / self.acquisitions * 1000, 3) if self.acquisitions else 0.0,
+                'espera_maxima_ms': round(self.max_wait_seconds * 1000, 3),
+                'tempo_esgotado': self.timeouts,
+                'fechadas': dict(self.closed)
+            }
+
+
+class Backend:
+    """Dialeto SQL e conexões de um banco de dados
+
+    As consultas do dashboard são as mesmas em todos os bancos; mudam apenas
+    o marcador de parâmetro, as expressões de dia, hora e texto, a soma sem
+    NULL e a forma de paginar as linhas.
+    """
+
+    name = None
+    placeholder = '?'
+
+    def day_expr(self, column):
+        """Dia (YYYY-MM-DD) como texto"""
+        raise NotImplementedError
+
+    def hour_expr(self, column):
+        """Hora do dia (0-23) como inteiro"""
+        raise NotImplementedError
+
+    def text_expr(self, column):
+        """Coluna como texto, para os filtros LIKE da tabela de dados detalhados
+
+        SQLite, MySQL e SQL Server convertem números e horários sozinhos no LIKE.
+        """
+        return column
+
+    def sum_expr(self, expr):
+        return f"COALESCE(SUM({expr}), 0)"
+
+    def page_query(self, columns, rest, order, params, limit, offset):
+        """Página de `limit` linhas a partir da linha `offset`, na ordem `order`"""
+        p = self.placeholder
+        return f"SELECT {columns} FROM {rest} ORDER BY {order} LIMIT {p} OFFSET {p}", list(params) + [limit, offset]
+
+    def connection(self):
+        raise NotImplementedError
+
+    def stats(self):
+        """Contadores das conexões do backend"""
+        return {'backend': self.name}
+
+
+class SQLiteBackend(Backend):
+    """Arquivo SQLite local (cópia baixada do Google Drive)"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+
+    def day_expr(self, column):
+        return f"substr({column}, 1, 10)"
+
+    def hour_expr(self, column):
+        return f"CAST(substr({column}, 1, 2) AS INTEGER)"
+
+    def sum_expr(self, expr):
+        # TOTAL devolve 0.0 (e não NULL) quando não há valores
+        return f"TOTAL({expr})"
+
+    @contextmanager
+    def connection(self):
+        # Conexão somente leitura por thread (db.py); não é fechada ao final
+        yield read_connection(self.path, immutable=True)
+
+
+class ServerBackend(Backend):
+    """Base dos bancos em servidor: conexões em um ConnectionPool"""
+
+    placeholder = '%s'
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.pool = ConnectionPool(self.connect)
+
+    def connect(self):
+        raise NotImplementedError
+
+    def connection(self):
+        return self.pool.connection()
+
+    def stats(self):
+        return dict(super().stats(), **self.pool.stats())
+
+
+class MySQLBackend(ServerBackend):
+    name = 'mysql'
+
+    def day_expr(self, column):
+        # %% porque o pymysql usa %s como marcador de parâmetro
+        return f"DATE_FORMAT({column}, '%%Y-%%m-%%d')"
+
+    def hour_expr(self, column):
+        return f"HOUR({column})"
+
+    def connect(self):
+        import pymysql
+        settings = dict(self.settings, port=int(self.settings.get('port', 3306)))
+        return pymysql.connect(**settings)
+
+
+class PostgreSQLBackend(ServerBackend):
+    name = 'postgresql'
+
+    def day_expr(self, column):
+        return f"to_char({column}, 'YYYY-MM-DD')"
+
+    def hour_expr(self, column):
+        return f"CAST(EXTRACT(HOUR FROM {column}) AS INTEGER)"
+
+    def text_expr(self, column):
+        # Sem conversão implícita: integer LIKE text não existe no PostgreSQL
+        return f"CAST({column} AS TEXT)"
+
+    def connect(self):
+        import psycopg2
+        conn = psycopg2.connect(**self.settings)
+        conn.set_session(readonly=True, autocommit=True)
+        return conn
+
+
+class SQLServerBackend(ServerBackend):
+    name = 'sqlserver'
+    placeholder = '?'
+
+    def day_expr(self, column):
+        return f"CONVERT(char(10), {column}, 23)"
+
+    def hour_expr(self, column):
+        return f"DATEPART(hour, {column})"
+
+    def page_query(self, columns, rest, order, params, limit, offset):
+        p = self.placeholder
+        query = f"SELECT {columns} FROM {rest} ORDER BY {order} OFFSET {p} ROWS FETCH NEXT {p} ROWS ONLY"
+        return query, list(params) + [offset, limit]
+
+    def connect(self):
+        import pyodbc
+        s = self.settings
+        parts = [f"DRIVER={{{s['driver']}}}", f"SERVER={s['server']}", f"DATABASE={s['database']}"]
+        if s.get('trusted_connection') == 'yes':
+            parts.append("Trusted_Connection=yes")
+        else:
+            parts += [f"UID={s['user']}", f"PWD={s['password']}"]
+        return pyodbc.connect(';'.join(parts), autocommit=True)
+
+
+# Dialeto padrão (arquivo local), usado pelas tabelas pré-agregadas e pelos índices
+SQLITE = SQLiteBackend()
+
+
+def create_backend(db_type=DB_TYPE):
+    """Cria o backend conforme DB_TYPE em config.py"""
+    if db_type == 'sqlite':
+        return SQLITE
+    if db_type == 'mysql':
+        return MySQLBackend(MYSQL_CONFIG)
+    if db_type == 'postgresql':
+        return PostgreSQLBackend(POSTGRESQL_CONFIG)
+    if db_type == 'sqlserver':
+        return SQLServerBackend(SQLSERVER_CONFIG)
+    raise ValueError(f"DB_TYPE desconhecido: {db_type}")
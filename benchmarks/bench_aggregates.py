@@ -0,0 +1,106 @@
+"""Compara o caminho antigo (SELECT * + groupbys no pandas) com a agregação no SQLite.
+
+Uso: python benchmarks/bench_aggregates.py [--rows 10000000] [--db caminho.db]
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from synthetic import create_synthetic_database
+from aggregates import DashboardFilters, query_aggregates, query_detail_rows
+from config import (
+    TABLE_NAME, DATE_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+)
+
+
+def legacy_path(db_path, start_date, end_date):
+    """Reproduz o processamento original de update_dashboard"""
+    conn = sqlite3.connect(db_path)
+    query = f"SELECT * FROM {TABLE_NAME} WHERE {DATE_FIELD} BETWEEN '{start_date}' AND '{end_date}'"
+    df = pd.read_sql_query(query, conn)
+    conn.close()
+
+    df['DATA'] = pd.to_datetime(df['DATA'])
+    df['UTILIZACAO'] = df[OPERATION_TIME_FIELD] / (df[OPERATION_TIME_FIELD] + df[IDLE_TIME_FIELD]) * 100
+    df[PIECES_IN_FIELD].sum()
+    df[PIECES_OUT_FIELD].sum()
+    df['DATA'].dt.date.nunique()
+    df.groupby(MACHINE_FIELD)[PIECES_IN_FIELD].sum()
+    df.groupby(df['DATA'].dt.date)[PIECES_IN_FIELD].sum()
+    df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum()
+    df[EFFICIENCY_IN_FIELD].mean(), df[EFFICIENCY_OUT_FIELD].mean()
+    df.groupby(MACHINE_FIELD)['UTILIZACAO'].mean()
+    df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum()
+    df['DiaSemana'] = df['DATA'].dt.day_name()
+    df['Hora'] = df['DATA'].dt.hour
+    df.groupby(['DiaSemana', 'Hora'])[PIECES_IN_FIELD].sum()
+    df.groupby(MACHINE_FIELD)[EFFICIENCY_IN_FIELD].mean()
+    df.groupby(df['DATA'].dt.date)['UTILIZACAO'].mean()
+    df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum()
+    df.head(10).to_dict('records')
+    return len(df)
+
+
+def sql_path(db_path, start_date, end_date):
+    """Agrega no SQLite e monta todos os recortes a partir do resultado agrupado"""
+    filters = DashboardFilters(start_date, end_date)
+    conn = sqlite3.connect(db_path)
+    aggregates = query_aggregates(conn, filters)
+    query_detail_rows(conn, filters).to_dict('records')
+    conn.close()
+
+    aggregates.totals
+    aggregates.by_machine
+    aggregates.by_client
+    aggregates.by_day
+    aggregates.by_weekday_hour
+    return len(aggregates.groups)
+
+
+def measure(function, *args, repeat=3):
+    """Retorna o melhor tempo de execução e o resultado da última chamada"""
+    best = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - inicio)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--db', default='dstechBD_sintetico.db')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        create_synthetic_database(args.db, args.rows)
+
+    conn = sqlite3.connect(args.db)
+    first_day, last_day = conn.execute(f"SELECT MIN({DATE_FIELD}), MAX({DATE_FIELD}) FROM {TABLE_NAME}").fetchone()
+    conn.close()
+
+    last = pd.Timestamp(last_day)
+    windows = {
+        '30 dias': ((last - pd.Timedelta(days=30)).strftime('%Y-%m-%d'), last_day),
+        'histórico completo': (first_day, last_day),
+    }
+
+    for name, (start_date, end_date) in windows.items():
+        legacy_time, rows = measure(legacy_path, args.db, start_date, end_date, repeat=args.repeat)
+        sql_time, groups = measure(sql_path, args.db, start_date, end_date, repeat=args.repeat)
+        print(f"{name}: {rows:,} registros")
+        print(f"  SELECT * + pandas: {legacy_time:8.3f}s")
+        print(f"  GROUP BY no SQLite: {sql_time:8.3f}s ({groups:,} grupos retornados)")
+        print(f"  ganho: {legacy_time / sql_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Tempo de montagem de cada gráfico: px + update_layout (anterior) e charts.py (go + template).
+
+Uso: python benchmarks/bench_charts.py [--rows 2000000] [--db caminho.db] [--start 2024-01-01 --end 2024-03-31]
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from dash_bootstrap_templates import load_figure_template
+
+from synthetic import create_synthetic_database
+from aggregates import UTILIZATION_FIELD, DashboardFilters, query_aggregates
+from charts import CHART_BUILDERS, LIGHT_LAYOUT
+from config import MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD, EFFICIENCY_IN_FIELD
+
+
+def _legacy(build):
+    """Gráfico do px com LIGHT_LAYOUT mesclado por update_layout, como antes"""
+    def chart(aggregates):
+        fig = build(aggregates)
+        fig.update_layout(**LIGHT_LAYOUT)
+        return fig
+    return chart
+
+
+def _legacy_comparison(aggregates):
+    totals = aggregates.totals
+    data = pd.DataFrame({'Tipo': ['Entrada', 'Saída'], 'Peças': [totals['pecas_entrada'], totals['pecas_saida']]})
+    return px.bar(data, x='Tipo', y='Peças', color='Tipo',
+                  color_discrete_map={'Entrada': '#3498db', 'Saída': '#2ecc71'})
+
+
+LEGACY_BUILDERS = {
+    'bar-chart': _legacy(lambda a: px.bar(a.by_machine, x=MACHINE_FIELD, y=PIECES_IN_FIELD,
+                                          color_discrete_sequence=px.colors.qualitative.Pastel)),
+    'line-chart': _legacy(lambda a: px.line(a.by_day, x='DATA', y=PIECES_IN_FIELD, line_shape='spline')),
+    'pie-chart': _legacy(lambda a: px.pie(a.by_client, values=PIECES_IN_FIELD, names=CLIENT_FIELD,
+                                          color_discrete_sequence=px.colors.qualitative.Bold)),
+    'comparison-chart': _legacy(_legacy_comparison),
+    'heatmap-chart': _legacy(lambda a: px.density_heatmap(a.by_weekday_hour, x='Hora', y='DiaSemana',
+                                                          z=PIECES_IN_FIELD, color_continuous_scale='Blues')),
+    'efficiency-comparison-chart': _legacy(lambda a: px.bar(a.by_machine, x=MACHINE_FIELD, y=EFFICIENCY_IN_FIELD)),
+    'utilization-trend-chart': _legacy(lambda a: px.line(a.by_day, x='DATA', y=UTILIZATION_FIELD, line_shape='spline')),
+    'client-performance-chart': _legacy(lambda a: px.bar(a.by_client, x=CLIENT_FIELD, y=PIECES_IN_FIELD)),
+}
+
+
+def measure(function, *args, repeat=20):
+    """Retorna o melhor tempo de execução"""
+    best = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - inicio)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--db', default='dstechBD_sintetico.db')
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2024-03-31')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        create_synthetic_database(args.db, args.rows)
+
+    # Mesmo tema padrão do dashboard
+    load_figure_template("bootstrap")
+    conn = sqlite3.connect(args.db)
+    aggregates = query_aggregates(conn, DashboardFilters(args.start, args.end))
+    conn.close()
+    aggregates.rollups
+
+    print(f"Período {args.start} a {args.end} ({pio.templates.default})")
+    total_legacy = total_new = 0.0
+    for chart_id, build in CHART_BUILDERS.items():
+        legacy_time = measure(LEGACY_BUILDERS[chart_id], aggregates, repeat=args.repeat)
+        new_time = measure(build, aggregates, repeat=args.repeat)
+        total_legacy += legacy_time
+        total_new += new_time
+        print(f"  {chart_id:28s} px: {legacy_time * 1000:7.2f} ms   go: {new_time * 1000:7.2f} ms "
+              f"({legacy_time / new_time:.1f}x)")
+    print(f"  {'total':28s} px: {total_legacy * 1000:7.2f} ms   go: {total_new * 1000:7.2f} ms "
+          f"({total_legacy / total_new:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
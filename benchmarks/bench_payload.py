@@ -0,0 +1,64 @@
+"""Tamanho (JSON) de cada gráfico enviado ao navegador: px + update_layout com o tema
+bootstrap completo (anterior) e charts.py + payload.compact_figure.
+
+Uso: python benchmarks/bench_payload.py [--rows 2000000] [--db caminho.db] [--start 2024-01-01 --end 2024-03-31]
+"""
+import argparse
+import gzip
+import os
+import sqlite3
+
+from dash_bootstrap_templates import load_figure_template
+from plotly.utils import PlotlyJSONEncoder
+
+from synthetic import create_synthetic_database
+from aggregates import DashboardFilters, query_aggregates
+from bench_charts import LEGACY_BUILDERS
+from charts import CHART_BUILDERS, use_light_template
+from config import COMPRESS_LEVEL
+from payload import TYPED_ARRAYS, compact_figure
+
+
+def encoded(figure):
+    """JSON da figura como o Dash envia na resposta do callback"""
+    return PlotlyJSONEncoder().encode(figure).encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--db', default='dstechBD_sintetico.db')
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2024-03-31')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        create_synthetic_database(args.db, args.rows)
+
+    conn = sqlite3.connect(args.db)
+    aggregates = query_aggregates(conn, DashboardFilters(args.start, args.end))
+    conn.close()
+
+    # Figuras anteriores: tema bootstrap completo
+    load_figure_template("bootstrap")
+    legacy = {chart_id: encoded(build(aggregates)) for chart_id, build in LEGACY_BUILDERS.items()}
+    # Figuras atuais: template reduzido e dados compactos
+    use_light_template()
+    compact = {chart_id: encoded(compact_figure(build(aggregates))) for chart_id, build in CHART_BUILDERS.items()}
+
+    print(f"Período {args.start} a {args.end} (typed arrays: {'sim' if TYPED_ARRAYS else 'não'})")
+    for chart_id in CHART_BUILDERS:
+        before, after = len(legacy[chart_id]), len(compact[chart_id])
+        print(f"  {chart_id:28s} antes: {before / 1024:7.1f} KB   depois: {after / 1024:7.1f} KB "
+              f"({1 - after / before:.0%} menor)")
+    total_before = sum(map(len, legacy.values()))
+    total_after = sum(map(len, compact.values()))
+    gzip_before = sum(len(gzip.compress(body, COMPRESS_LEVEL)) for body in legacy.values())
+    gzip_after = sum(len(gzip.compress(body, COMPRESS_LEVEL)) for body in compact.values())
+    print(f"  {'total':28s} antes: {total_before / 1024:7.1f} KB   depois: {total_after / 1024:7.1f} KB")
+    print(f"  {'total com gzip':28s} antes: {gzip_before / 1024:7.1f} KB   depois: {gzip_after / 1024:7.1f} KB "
+          f"({1 - gzip_after / gzip_before:.0%} menor)")
+
+
+if __name__ == '__main__':
+    main()
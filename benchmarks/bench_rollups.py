@@ -0,0 +1,97 @@
+"""Microbenchmarks do cálculo dos recortes do dashboard.
+
+Compara, sobre os mesmos registros:
+  - os groupbys separados do update_dashboard original com aggregate_frame + compute_rollups;
+  - um groupby do pandas por recorte com compute_rollups (uma passada de np.bincount).
+
+Uso: python benchmarks/bench_rollups.py [--rows 2000000] [--db caminho.db]
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from synthetic import create_synthetic_database
+from aggregates import FRAME_COLUMNS, GROUP_SUMS, aggregate_frame, compute_rollups
+from config import (
+    TABLE_NAME, DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, EFFICIENCY_IN_FIELD, OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+)
+
+
+def legacy_groupbys(df):
+    """Os agrupamentos de update_dashboard sobre os registros brutos"""
+    df = df.copy()
+    df['DATA'] = pd.to_datetime(df[DATE_FIELD].dt.strftime('%Y-%m-%d') + ' ' + df[TIME_FIELD])
+    df['UTILIZACAO'] = df[OPERATION_TIME_FIELD] / (df[OPERATION_TIME_FIELD] + df[IDLE_TIME_FIELD]) * 100
+    df['DATA'].dt.date.nunique()
+    df.groupby(MACHINE_FIELD)[PIECES_IN_FIELD].sum()
+    df.groupby(df['DATA'].dt.date)[PIECES_IN_FIELD].sum()
+    df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum()
+    df.groupby(MACHINE_FIELD)['UTILIZACAO'].mean()
+    df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum()
+    df.groupby([df['DATA'].dt.day_name(), df['DATA'].dt.hour])[PIECES_IN_FIELD].sum()
+    df.groupby(MACHINE_FIELD)[EFFICIENCY_IN_FIELD].mean()
+    df.groupby(df['DATA'].dt.date)['UTILIZACAO'].mean()
+    df.groupby(CLIENT_FIELD)[PIECES_IN_FIELD].sum()
+
+
+def engine(df):
+    """Agrupamento fino e todos os recortes calculados de uma vez"""
+    compute_rollups(aggregate_frame(df))
+
+
+def groupby_per_rollup(groups):
+    """Um groupby do pandas por recorte sobre o agrupamento fino (implementação anterior)"""
+    groups.groupby(MACHINE_FIELD)[GROUP_SUMS].sum()
+    groups.groupby(CLIENT_FIELD)['pecas_entrada'].sum()
+    by_day = groups.groupby('dia')[GROUP_SUMS].sum()
+    pd.to_datetime(by_day.index, format='%Y-%m-%d')
+    names = pd.to_datetime(groups['dia'], format='%Y-%m-%d').dt.day_name()
+    groups.groupby([names, groups['hora']])['pecas_entrada'].sum()
+    groups['dia'].nunique()
+
+
+def measure(function, *args, repeat=5):
+    """Retorna o melhor tempo de execução"""
+    best = float('inf')
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - inicio)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--db', default='dstechBD_sintetico.db')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        create_synthetic_database(args.db, args.rows)
+
+    conn = sqlite3.connect(args.db)
+    df = pd.read_sql_query(f"SELECT {', '.join(FRAME_COLUMNS)} FROM {TABLE_NAME} LIMIT ?", conn, params=(args.rows,))
+    conn.close()
+    df[DATE_FIELD] = pd.to_datetime(df[DATE_FIELD], format='%Y-%m-%d')
+    groups = aggregate_frame(df)
+
+    legacy_time = measure(legacy_groupbys, df, repeat=args.repeat)
+    engine_time = measure(engine, df, repeat=args.repeat)
+    print(f"Registros brutos: {len(df):,}")
+    print(f"  groupbys separados:                {legacy_time:8.3f}s")
+    print(f"  aggregate_frame + compute_rollups: {engine_time:8.3f}s ({legacy_time / engine_time:.1f}x)")
+
+    per_rollup_time = measure(groupby_per_rollup, groups, repeat=args.repeat)
+    rollups_time = measure(compute_rollups, groups, repeat=args.repeat)
+    print(f"Agrupamento fino: {len(groups):,} grupos")
+    print(f"  um groupby por recorte: {per_rollup_time * 1000:8.2f} ms")
+    print(f"  compute_rollups:        {rollups_time * 1000:8.2f} ms ({per_rollup_time / rollups_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import sys
+import time
+
+# Permite importar os módulos da raiz do projeto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    TABLE_NAME, DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+)
+
+
+def create_synthetic_database(path, rows, machines=3, lines=2, start='2024-01-01'):
+    """Cria uma tabela DADOS sintética com um registro por máquina por minuto"""
+    if os.path.exists(path):
+        os.remove(path)
+
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute(f"""
+        CREATE TABLE {TABLE_NAME} (
+            {DATE_FIELD} TEXT,
+            {TIME_FIELD} TEXT,
+            {MACHINE_FIELD} INTEGER,
+            {CLIENT_FIELD} INTEGER,
+            {PIECES_IN_FIELD} INTEGER,
+            {PIECES_OUT_FIELD} INTEGER,
+            {EFFICIENCY_IN_FIELD} REAL,
+            {EFFICIENCY_OUT_FIELD} REAL,
+            {OPERATION_TIME_FIELD} INTEGER,
+            {IDLE_TIME_FIELD} INTEGER
+        )
+    """)
+    # Gera as linhas inteiramente no SQLite para não criar objetos Python por registro
+    conn.execute(f"""
+        WITH RECURSIVE seq(i) AS (
+            SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < :rows - 1
+        )
+        INSERT INTO {TABLE_NAME}
+        SELECT date(:start, '+' || ((i / :machines) / 1440) || ' days'),
+               time(((i / :machines) % 1440) * 60, 'unixepoch'),
+               (i % :machines) + 1,
+               (i % :machines) % :lines + 1,
+               abs(random()) % 60,
+               abs(random()) % 60,
+               abs(random()) % 10000 / 100.0,
+               abs(random()) % 10000 / 100.0,
+               abs(random()) % 61,
+               abs(random()) % 61
+        FROM seq
+    """, {'rows': rows, 'machines': machines, 'lines': lines, 'start': start})
+    conn.commit()
+    conn.close()
+    print(f"Banco sintético criado em {path}: {rows:,} registros ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == '__main__':
+    destino = sys.argv[1] if len(sys.argv) > 1 else 'dstechBD_sintetico.db'
+    quantidade = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000
+    create_synthetic_database(destino, quantidade)
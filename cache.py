@@ -0,0 +1,260 @@
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import (
+    RESULT_CACHE_BACKEND, RESULT_CACHE_PATH, RESULT_CACHE_TTL,
+    RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES
+)
+
+# Intervalo mínimo (segundos) entre gravações do horário de acesso de uma entrada no cache
+# compartilhado; a leitura de um resultado não precisa de transação de escrita
+ACCESS_UPDATE_INTERVAL = 60
+
+
+class ResultCache:
+    """Cache LRU de resultados do dashboard em memória, limitado por quantidade e por memória
+
+    Cada processo (worker do gunicorn) tem a sua própria cópia.
+    """
+
+    shared = False
+
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES, max_bytes=RESULT_CACHE_MAX_BYTES,
+                 ttl=RESULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.db_version = 0
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def get_db_version(self):
+        """Retorna a versão atual do banco de dados"""
+        return self.db_version
+
+    def bump_db_version(self):
+        """Invalida os resultados em cache ao trocar o arquivo do banco de dados"""
+        with self._lock:
+            self.db_version += 1
+        self.clear()
+        return self.db_version
+
+    def get(self, key):
+        """Retorna o resultado em cache (ou None) e atualiza os contadores"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry['created'] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry['duration']
+            return entry['value']
+
+    def set(self, key, value, duration=0.0):
+        """Armazena um resultado, descartando os menos usados se passar dos limites"""
+        size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = {'value': value, 'size': size, 'duration': duration, 'created': time.time()}
+            self.size_bytes += size
+
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry['size']
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        """Contadores de uso do cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'entradas': len(self._entries),
+                'bytes': self.size_bytes,
+                'acertos': self.hits,
+                'falhas': self.misses,
+                'descartes': self.evictions,
+                'taxa_acerto': round(self.hits / total, 3) if total else 0.0,
+                'segundos_economizados': round(self.saved_seconds, 3),
+                'versao_banco': self.db_version
+            }
+
+
+class SQLiteResultCache:
+    """Cache de resultados compartilhado por todos os workers do mesmo servidor
+
+    Os resultados ficam serializados em um arquivo SQLite local, com expiração
+    (TTL) e descarte dos menos acessados quando o tamanho total passa do limite.
+    A versão do banco de dados e os descartes também ficam no arquivo, de modo
+    que um resultado calculado por um worker atende requisições dos demais.
+    Acertos e falhas são contados em cada worker, para que as leituras não
+    gravem no arquivo; o horário de acesso (usado no descarte) só é gravado
+    quando tem mais de ACCESS_UPDATE_INTERVAL segundos.
+    """
+
+    shared = True
+
+    def __init__(self, path=RESULT_CACHE_PATH, max_entries=RESULT_CACHE_MAX_ENTRIES,
+                 max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        with self._connection() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entradas (
+                    chave TEXT PRIMARY KEY,
+                    valor BLOB,
+                    tamanho INTEGER,
+                    duracao REAL,
+                    criado REAL,
+                    acessado REAL
+                );
+                CREATE INDEX IF NOT EXISTS IDX_ENTRADAS_ACESSADO ON entradas (acessado);
+                CREATE TABLE IF NOT EXISTS contadores (nome TEXT PRIMARY KEY, valor REAL);
+                INSERT OR IGNORE INTO contadores VALUES ('versao_banco', 0), ('descartes', 0);
+            """)
+
+    def _connection(self):
+        """Conexão por thread (e por processo, após o fork dos workers)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _increment(self, conn, name, amount=1):
+        conn.execute("UPDATE contadores SET valor = valor + ? WHERE nome = ?", (amount, name))
+
+    def get_db_version(self):
+        """Retorna a versão atual do banco de dados (compartilhada entre os workers)"""
+        row = self._connection().execute(
+            "SELECT valor FROM contadores WHERE nome = 'versao_banco'"
+        ).fetchone()
+        return int(row[0])
+
+    def bump_db_version(self):
+        """Invalida os resultados em cache de todos os workers ao trocar o banco de dados"""
+        with self._connection() as conn:
+            self._increment(conn, 'versao_banco')
+            conn.execute("DELETE FROM entradas")
+        return self.get_db_version()
+
+    def get(self, key):
+        """Retorna o resultado em cache (ou None) e atualiza os contadores"""
+        now = time.time()
+        chave = json.dumps(key)
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT valor, duracao, acessado FROM entradas WHERE chave = ? AND criado > ?",
+            (chave, now - self.ttl)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1]
+        if now - row[2] > ACCESS_UPDATE_INTERVAL:
+            with conn:
+                conn.execute("UPDATE entradas SET acessado = ? WHERE chave = ?", (now, chave))
+        return pickle.loads(row[0])
+
+    def set(self, key, value, duration=0.0):
+        """Armazena um resultado, removendo expirados e os menos acessados se passar dos limites"""
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_bytes:
+            return False
+
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, ?, ?)",
+                (json.dumps(key), data, len(data), duration, now, now)
+            )
+            expired = conn.execute("DELETE FROM entradas WHERE criado <= ?", (now - self.ttl,)).rowcount
+
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()
+            evicted = 0
+            for chave, tamanho in conn.execute(
+                "SELECT chave, tamanho FROM entradas ORDER BY acessado"
+            ).fetchall():
+                if count <= self.max_entries and size <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+                count -= 1
+                size -= tamanho
+                evicted += 1
+            self._increment(conn, 'descartes', expired + evicted)
+        return True
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entradas")
+
+    def stats(self):
+        """Contadores de uso do cache (acertos e falhas do worker que atende a requisição)"""
+        conn = self._connection()
+        counters = dict(conn.execute("SELECT nome, valor FROM contadores").fetchall())
+        count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()
+        with self._lock:
+            hits, misses, saved_seconds = self.hits, self.misses, self.saved_seconds
+        total = hits + misses
+        return {
+            'backend': 'sqlite',
+            'entradas': count,
+            'bytes': size,
+            'acertos': hits,
+            'falhas': misses,
+            'descartes': int(counters['descartes']),
+            'taxa_acerto': round(hits / total, 3) if total else 0.0,
+            'segundos_economizados': round(saved_seconds, 3),
+            'versao_banco': int(counters['versao_banco']),
+            'pid': os.getpid()
+        }
+
+
+def create_result_cache():
+    """Cria o cache de resultados conforme RESULT_CACHE_BACKEND em config.py"""
+    if RESULT_CACHE_BACKEND == 'sqlite':
+        try:
+            return SQLiteResultCache()
+        except sqlite3.Error as e:
+            print(f"Erro ao abrir o cache compartilhado ({str(e)}). Usando cache em memória.")
+    return ResultCache()
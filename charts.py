@@ -0,0 +1,263 @@
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+from dash import html, dash_table
+from config import MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD, EFFICIENCY_IN_FIELD, DETAIL_PAGE_SIZE
+from aggregates import UTILIZATION_FIELD, DETAIL_COLUMNS, DETAIL_TEXT_COLUMNS
+
+# Configuração de tema claro para todos os gráficos
+LIGHT_LAYOUT = dict(
+    paper_bgcolor='#f5f7fa',
+    plot_bgcolor='#f5f7fa',
+    font=dict(color='#2c3e50'),
+    title=dict(font=dict(color='#3498db', size=18)),
+    xaxis=dict(
+        gridcolor='#cccccc',
+        zerolinecolor='#cccccc',
+        title=dict(font=dict(color='#2c3e50')),
+        tickfont=dict(color='#2c3e50')
+    ),
+    yaxis=dict(
+        gridcolor='#cccccc',
+        zerolinecolor='#cccccc',
+        title=dict(font=dict(color='#2c3e50')),
+        tickfont=dict(color='#2c3e50')
+    ),
+    legend=dict(font=dict(color='#2c3e50')),
+    margin=dict(t=50, b=50, l=50, r=30)
+)
+
+# Template registrado em plotly.io.templates (ver use_light_template)
+TEMPLATE_NAME = 'dstech_claro'
+# Partes do tema padrão mantidas no template; o restante (eixos 3D, mapas, polar...)
+# não é usado pelos gráficos e seria enviado ao navegador junto com cada figura
+TEMPLATE_LAYOUT_KEYS = [
+    'colorway', 'font', 'hoverlabel', 'hovermode', 'paper_bgcolor', 'plot_bgcolor',
+    'title', 'xaxis', 'yaxis', 'legend', 'margin'
+]
+TEMPLATE_TRACE_TYPES = ['bar', 'scatter', 'pie', 'histogram2d']
+
+# Cores das sequências usadas pelos gráficos
+PASTEL = px.colors.qualitative.Pastel
+BOLD = px.colors.qualitative.Bold
+
+
+def empty_figure():
+    """Retorna um gráfico vazio quando não há dados"""
+    empty_fig = go.Figure().add_annotation(
+        text="Nenhum dado encontrado para os filtros selecionados",
+        xref="paper", yref="paper",
+        x=0.5, y=0.5, showarrow=False
+    )
+    # Configurar tema claro para gráficos vazios
+    empty_fig.update_layout(
+        paper_bgcolor='#f5f7fa',
+        plot_bgcolor='#f5f7fa',
+        font=dict(color='#2c3e50')
+    )
+    return empty_fig
+
+
+def use_light_template():
+    """Registra o tema padrão atual com LIGHT_LAYOUT em plotly.io.templates e o torna padrão
+
+    Chamado na inicialização, depois de load_figure_template (e de novo se o
+    tema padrão mudar). O Plotly aplica o template padrão às figuras sem
+    validá-lo de novo, em vez de mesclar LIGHT_LAYOUT em cada figura com
+    update_layout. Só as partes do tema usadas pelos gráficos são mantidas,
+    já que o template vai junto com cada figura para o navegador.
+    """
+    if pio.templates.default != TEMPLATE_NAME:
+        base = pio.templates[pio.templates.default].to_plotly_json()
+        template = go.layout.Template(
+            layout={k: v for k, v in base.get('layout', {}).items() if k in TEMPLATE_LAYOUT_KEYS},
+            data={k: v for k, v in base.get('data', {}).items() if k in TEMPLATE_TRACE_TYPES}
+        )
+        template.layout.update(LIGHT_LAYOUT)
+        pio.templates[TEMPLATE_NAME] = template
+        pio.templates.default = TEMPLATE_NAME
+    return TEMPLATE_NAME
+
+
+def _figure(traces, title, x_title=None, y_title=None, **layout):
+    """Figura com os traços já montados e o título (o template vem de use_light_template)"""
+    use_light_template()
+    return go.Figure(data=traces, layout=dict(
+        title_text=title,
+        xaxis_title_text=x_title,
+        yaxis_title_text=y_title,
+        **layout
+    ))
+
+
+def _hover(x_name, y_name):
+    return f"{x_name}=%{{x}}<br>{y_name}=%{{y}}<extra></extra>"
+
+
+def _bar(df, x, y, title, color):
+    """Barras verticais de uma coluna por outra"""
+    trace = go.Bar(
+        x=df[x].to_numpy(), y=df[y].to_numpy(),
+        marker_color=color, hovertemplate=_hover(x, y)
+    )
+    return _figure([trace], title, x, y)
+
+
+def _line(df, x, y, title, color):
+    """Linha suavizada de uma coluna por outra"""
+    trace = go.Scatter(
+        x=df[x].to_numpy(), y=df[y].to_numpy(), mode='lines',
+        line=dict(shape='spline', color=color), hovertemplate=_hover(x, y)
+    )
+    return _figure([trace], title, x, y)
+
+
+def production_by_machine(aggregates):
+    """Gráfico de barras - Produção por máquina"""
+    return _bar(aggregates.by_machine, MACHINE_FIELD, PIECES_IN_FIELD, 'Produção por Máquina', PASTEL[0])
+
+
+def production_trend(aggregates):
+    """Gráfico de linha - Tendência de produção"""
+    return _line(aggregates.by_day, 'DATA', PIECES_IN_FIELD, 'Tendência de Produção', '#3498db')
+
+
+def client_distribution(aggregates):
+    """Gráfico de pizza - Distribuição por cliente"""
+    client_data = aggregates.by_client
+    clients = client_data[CLIENT_FIELD].to_numpy()
+    pieces = client_data[PIECES_IN_FIELD].to_numpy()
+
+    # Verificar se há mais de um cliente antes de criar o gráfico de pizza
+    if len(client_data) > 1:
+        trace = go.Pie(
+            labels=clients, values=pieces,
+            marker_colors=[BOLD[i % len(BOLD)] for i in range(len(clients))],
+            textfont_color='#2c3e50',
+            hovertemplate=f"{CLIENT_FIELD}=%{{label}}<br>{PIECES_IN_FIELD}=%{{value}}<extra></extra>"
+        )
+        return _figure([trace], 'Distribuição por Cliente')
+
+    # Se houver apenas um cliente, criar um gráfico de barras horizontal
+    trace = go.Bar(
+        y=clients, x=pieces, orientation='h',
+        marker_color='#3498db', textfont_color='#2c3e50',
+        hovertemplate=f"{PIECES_IN_FIELD}=%{{x}}<br>{CLIENT_FIELD}=%{{y}}<extra></extra>"
+    )
+    return _figure([trace], 'Produção do Cliente', PIECES_IN_FIELD, 'Cliente')
+
+
+def pieces_comparison(aggregates):
+    """Gráfico de comparação - Entrada vs Saída"""
+    totals = aggregates.totals
+    traces = [
+        go.Bar(
+            x=[tipo], y=[value], name=tipo, marker_color=color,
+            hovertemplate=f"Tipo={tipo}<br>Peças=%{{y}}<extra></extra>"
+        )
+        for tipo, value, color in (
+            ('Entrada', totals['pecas_entrada'], '#3498db'),
+            ('Saída', totals['pecas_saida'], '#2ecc71'),
+        )
+    ]
+    return _figure(traces, 'Comparação: Entrada vs Saída', 'Tipo', 'Peças', legend_title_text='Tipo')
+
+
+def weekday_hour_heatmap(aggregates):
+    """Mapa de calor - Produção por dia e hora"""
+    data = aggregates.by_weekday_hour
+    trace = go.Histogram2d(
+        x=data['Hora'].to_numpy(), y=data['DiaSemana'].to_numpy(), z=data[PIECES_IN_FIELD].to_numpy(),
+        histfunc='sum', colorscale='Blues', colorbar_title_text=f'sum of {PIECES_IN_FIELD}',
+        hovertemplate=f"Hora=%{{x}}<br>DiaSemana=%{{y}}<br>sum of {PIECES_IN_FIELD}=%{{z}}<extra></extra>"
+    )
+    return _figure([trace], 'Produção por Dia e Hora', 'Hora', 'DiaSemana')
+
+
+def efficiency_by_machine(aggregates):
+    """Gráfico de eficiência por máquina"""
+    return _bar(aggregates.by_machine, MACHINE_FIELD, EFFICIENCY_IN_FIELD, 'Eficiência por Máquina', '#e74c3c')
+
+
+def utilization_trend(aggregates):
+    """Gráfico de tendência de utilização"""
+    return _line(aggregates.by_day, 'DATA', UTILIZATION_FIELD, 'Tendência de Utilização', '#9b59b6')
+
+
+def client_performance(aggregates):
+    """Gráfico de desempenho por cliente"""
+    return _bar(aggregates.by_client, CLIENT_FIELD, PIECES_IN_FIELD, 'Desempenho por Cliente', '#f39c12')
+
+
+def _format_number(value):
+    return f"{int(value):,}".replace(',', '.')
+
+
+def kpi_values(aggregates):
+    """KPIs formatados: total de peças, média diária, peças de entrada e de saída"""
+    totals = aggregates.totals
+    total_pecas = totals['pecas_entrada']
+    media_diaria = total_pecas / max(totals['dias'], 1)  # Evitar divisão por zero
+    return [
+        _format_number(total_pecas),
+        _format_number(media_diaria),
+        _format_number(totals['pecas_entrada']),
+        _format_number(totals['pecas_saida'])
+    ]
+
+
+def detail_table(table_id):
+    """Tabela de dados detalhados
+
+    Paginação, ordenação e filtros são feitos no servidor (modo 'custom'):
+    o navegador recebe só as linhas da página atual.
+    """
+    return html.Div([
+        dash_table.DataTable(
+            id=table_id,
+            data=[],
+            columns=[
+                {"name": column, "id": column, "type": 'text' if column in DETAIL_TEXT_COLUMNS else 'numeric'}
+                for column in DETAIL_COLUMNS
+            ],
+            page_action='custom',
+            page_current=0,
+            page_size=DETAIL_PAGE_SIZE,
+            sort_action='custom',
+            sort_mode='multi',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
+            style_table={'overflowX': 'auto'},
+            style_cell={
+                'textAlign': 'left',
+                'backgroundColor': '#ffffff',
+                'color': '#2c3e50'
+            },
+            style_header={
+                'backgroundColor': '#f5f7fa',
+                'fontWeight': 'bold',
+                'color': '#3498db'
+            }
+        )
+    ])
+
+
+def detail_summary(total):
+    """Texto com a quantidade de registros da tabela de dados detalhados"""
+    if not total:
+        return "Nenhum dado encontrado"
+    return f"{_format_number(total)} registros"
+
+
+# Gráficos do dashboard: id do componente -> função que monta a figura
+CHART_BUILDERS = {
+    'bar-chart': production_by_machine,
+    'line-chart': production_trend,
+    'pie-chart': client_distribution,
+    'comparison-chart': pieces_comparison,
+    'heatmap-chart': weekday_hour_heatmap,
+    'efficiency-comparison-chart': efficiency_by_machine,
+    'utilization-trend-chart': utilization_trend,
+    'client-performance-chart': client_performance,
+}
@@ -0,0 +1,269 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from config import (
+    DB_PATH, COLSTORE_DIR, TABLE_NAME, DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+)
+from aggregates import (
+    GROUP_SUMS, BAND_CODES, EFFICIENCY_BAND_FIELD, UTILIZATION_BAND_FIELD,
+    band_codes, efficiency_values, utilization_values
+)
+from versions import current_version, version_current, new_version_dir, publish_version, version_name
+
+# Versão do formato das colunas (faz armazenamentos antigos serem gravados de novo)
+COLSTORE_FORMAT = 2
+EXPORT_CHUNK_ROWS = 500000
+
+# Código usado quando MAQUINA/LINHA/HORA são nulos
+NULL_CODE = -1
+
+# Colunas numéricas guardadas como float64 (NaN = nulo)
+VALUE_COLUMNS = [
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+]
+
+# Acima desta quantidade de grupos possíveis o bincount direto ocuparia memória demais
+MAX_DENSE_GROUPS = 2000000
+
+_open_lock = threading.Lock()
+_opened = {}
+
+
+def colstore_current(db_path=DB_PATH, store_dir=COLSTORE_DIR):
+    """Verifica se o armazenamento colunar corresponde ao arquivo de origem atual"""
+    return version_current(store_dir, db_path, COLSTORE_FORMAT)
+
+
+def _day_numbers(dates):
+    """Converte datas YYYY-MM-DD em dias desde 1970-01-01"""
+    days = pd.to_datetime(dates.str.slice(0, 10), format='%Y-%m-%d')
+    return days.values.astype('datetime64[D]').astype(np.int32)
+
+
+def _codes(series, values):
+    """Códigos inteiros pequenos para MAQUINA/LINHA (posição em `values`)"""
+    numbers = pd.to_numeric(series, errors='coerce')
+    codes = np.searchsorted(values, numbers.fillna(0).to_numpy())
+    return np.where(numbers.isna().to_numpy(), NULL_CODE, codes).astype(np.int16)
+
+
+def export_colstore(db_path=DB_PATH, store_dir=COLSTORE_DIR):
+    """Grava um .npy por coluna de DADOS usada no dashboard, ordenado por DATA e HORA
+
+    As colunas são preenchidas em blocos, sem carregar a tabela inteira na
+    memória. Como no snapshot Parquet, cada exportação vai para um diretório
+    próprio e o arquivo ATUAL só aponta para ela no final.
+    """
+    inicio = time.time()
+    version = version_name(db_path, COLSTORE_FORMAT)
+    target = new_version_dir(store_dir, version)
+    os.makedirs(target)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE {DATE_FIELD} IS NOT NULL"
+        ).fetchone()[0]
+        values = {}
+        for field in (MACHINE_FIELD, CLIENT_FIELD):
+            distinct = conn.execute(
+                f"SELECT DISTINCT {field} FROM {TABLE_NAME} WHERE {field} IS NOT NULL ORDER BY 1"
+            ).fetchall()
+            values[field] = np.array([row[0] for row in distinct], dtype=np.int64)
+            np.save(os.path.join(target, f'{field}_valores.npy'), values[field])
+
+        def column(name, dtype):
+            return np.lib.format.open_memmap(os.path.join(target, f'{name}.npy'), mode='w+', dtype=dtype, shape=(rows,))
+
+        arrays = {
+            DATE_FIELD: column(DATE_FIELD, np.int32),
+            TIME_FIELD: column(TIME_FIELD, np.int8),
+            MACHINE_FIELD: column(MACHINE_FIELD, np.int16),
+            CLIENT_FIELD: column(CLIENT_FIELD, np.int16),
+        }
+        for field in VALUE_COLUMNS:
+            arrays[field] = column(field, np.float64)
+        # Faixas de eficiência e utilização de cada registro, para os filtros de faixa
+        arrays[EFFICIENCY_BAND_FIELD] = column(EFFICIENCY_BAND_FIELD, np.int8)
+        arrays[UTILIZATION_BAND_FIELD] = column(UTILIZATION_BAND_FIELD, np.int8)
+
+        query = f"""
+            SELECT {DATE_FIELD}, {TIME_FIELD}, {MACHINE_FIELD}, {CLIENT_FIELD}, {', '.join(VALUE_COLUMNS)}
+            FROM {TABLE_NAME}
+            WHERE {DATE_FIELD} IS NOT NULL
+            ORDER BY {DATE_FIELD}, {TIME_FIELD}
+        """
+        position = 0
+        for chunk in pd.read_sql_query(query, conn, chunksize=EXPORT_CHUNK_ROWS):
+            end = position + len(chunk)
+            arrays[DATE_FIELD][position:end] = _day_numbers(chunk[DATE_FIELD])
+            hours = pd.to_numeric(chunk[TIME_FIELD].str.slice(0, 2), errors='coerce')
+            arrays[TIME_FIELD][position:end] = hours.fillna(NULL_CODE).to_numpy(np.int8)
+            arrays[MACHINE_FIELD][position:end] = _codes(chunk[MACHINE_FIELD], values[MACHINE_FIELD])
+            arrays[CLIENT_FIELD][position:end] = _codes(chunk[CLIENT_FIELD], values[CLIENT_FIELD])
+            for field in VALUE_COLUMNS:
+                arrays[field][position:end] = pd.to_numeric(chunk[field], errors='coerce').to_numpy(np.float64)
+            arrays[EFFICIENCY_BAND_FIELD][position:end] = band_codes(efficiency_values(
+                arrays[EFFICIENCY_IN_FIELD][position:end], arrays[EFFICIENCY_OUT_FIELD][position:end]
+            ))
+            arrays[UTILIZATION_BAND_FIELD][position:end] = band_codes(utilization_values(
+                arrays[OPERATION_TIME_FIELD][position:end], arrays[IDLE_TIME_FIELD][position:end]
+            ))
+            position = end
+        for array in arrays.values():
+            array.flush()
+        del arrays
+    finally:
+        conn.close()
+
+    publish_version(store_dir, version)
+    print(f"Armazenamento colunar de {TABLE_NAME} gravado em {target} ({rows} registros, {time.time() - inicio:.1f}s)")
+
+
+def refresh_colstore(db_path=DB_PATH, store_dir=COLSTORE_DIR):
+    """Grava o armazenamento colunar se estiver ausente ou desatualizado"""
+    try:
+        if colstore_current(db_path, store_dir):
+            print("Armazenamento colunar já está atualizado.")
+            return True
+        export_colstore(db_path, store_dir)
+        return True
+    except Exception as e:
+        print(f"Erro ao gravar o armazenamento colunar: {str(e)}")
+        return False
+
+
+def open_colstore(store_dir=COLSTORE_DIR):
+    """Abre as colunas da versão atual com memória mapeada (uma vez por processo e versão)
+
+    As páginas dos arquivos ficam no cache do sistema operacional e são
+    compartilhadas por todos os workers; a memória própria de cada processo
+    não cresce com o tamanho do histórico.
+    """
+    version = current_version(store_dir)
+    if version is None:
+        return None
+    with _open_lock:
+        opened = _opened.get(store_dir)
+        if opened is None or opened[0] != version:
+            path = os.path.join(store_dir, version)
+            columns = {
+                name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+                for name in os.listdir(path) if name.endswith('.npy')
+            }
+            opened = (version, columns)
+            _opened[store_dir] = opened
+        return opened[1]
+
+
+def _day_number(value):
+    return int(np.datetime64(value[:10], 'D').astype(np.int64))
+
+
+def _group_ids(keys, size):
+    """Índice de grupo de cada registro: bincount direto quando cabe, senão np.unique"""
+    if size <= MAX_DENSE_GROUPS:
+        counts = np.bincount(keys, minlength=size)
+        present = np.flatnonzero(counts)
+        remap = np.zeros(size, dtype=np.int64)
+        remap[present] = np.arange(len(present))
+        return present, remap[keys]
+    return np.unique(keys, return_inverse=True)
+
+
+def colstore_groups(filters, store_dir=COLSTORE_DIR):
+    """Agrupamento (dia, hora, máquina, linha) calculado sobre as colunas mapeadas
+
+    O período vira uma busca binária na coluna DATA ordenada; os agrupamentos
+    são np.bincount sobre códigos inteiros pequenos. Retorna o mesmo formato
+    da consulta GROUP BY de aggregates.py.
+    """
+    columns = open_colstore(store_dir)
+    days = columns[DATE_FIELD]
+    start, end = 0, len(days)
+    if filters.start_date and filters.end_date:
+        start = np.searchsorted(days, _day_number(filters.start_date), side='left')
+        end = np.searchsorted(days, _day_number(filters.end_date), side='right')
+
+    selection = slice(start, end)
+    mask = None
+    for field, value in ((MACHINE_FIELD, filters.machine), (CLIENT_FIELD, filters.client)):
+        if value and value != 'all':
+            values = columns[f'{field}_valores']
+            code = np.searchsorted(values, int(value))
+            if code >= len(values) or values[code] != int(value):
+                code = len(values)  # valor inexistente: nenhum registro
+            condition = columns[field][selection] == code
+            mask = condition if mask is None else mask & condition
+    for field, band in ((EFFICIENCY_BAND_FIELD, filters.efficiency), (UTILIZATION_BAND_FIELD, filters.utilization)):
+        if band and band != 'all':
+            condition = columns[field][selection] == BAND_CODES[band]
+            mask = condition if mask is None else mask & condition
+
+    def take(field):
+        data = columns[field][selection]
+        return data if mask is None else data[mask]
+
+    day = take(DATE_FIELD)
+    if len(day) == 0:
+        return pd.DataFrame(columns=['dia', 'hora', MACHINE_FIELD, CLIENT_FIELD] + GROUP_SUMS)
+
+    # Chave única por (dia, hora, máquina, linha); +1 desloca os códigos nulos para 0
+    first_day = int(day[0])
+    n_days = int(day[-1]) - first_day + 1
+    n_machines = len(columns[f'{MACHINE_FIELD}_valores']) + 1
+    n_clients = len(columns[f'{CLIENT_FIELD}_valores']) + 1
+    keys = (day - first_day).astype(np.int64)
+    keys = keys * 25 + (take(TIME_FIELD) + 1)
+    keys = keys * n_machines + (take(MACHINE_FIELD) + 1)
+    keys = keys * n_clients + (take(CLIENT_FIELD) + 1)
+    present, ids = _group_ids(keys, n_days * 25 * n_machines * n_clients)
+    n_groups = len(present)
+
+    def total(values):
+        valid = ~np.isnan(values)
+        return np.bincount(ids, weights=np.where(valid, values, 0.0), minlength=n_groups), \
+            np.bincount(ids, weights=valid, minlength=n_groups).astype(np.int64)
+
+    pecas_entrada, _ = total(take(PIECES_IN_FIELD))
+    pecas_saida, _ = total(take(PIECES_OUT_FIELD))
+    ef_entrada_soma, ef_entrada_n = total(take(EFFICIENCY_IN_FIELD))
+    ef_saida_soma, ef_saida_n = total(take(EFFICIENCY_OUT_FIELD))
+    utilizacao_soma, utilizacao_n = total(utilization_values(take(OPERATION_TIME_FIELD), take(IDLE_TIME_FIELD)))
+
+    # Decodifica a chave de volta para as colunas do agrupamento
+    present, client_code = np.divmod(present, n_clients)
+    present, machine_code = np.divmod(present, n_machines)
+    day_offset, hour = np.divmod(present, 25)
+    hour = hour - 1
+
+    def decode(field, codes):
+        values = columns[f'{field}_valores']
+        decoded = values[np.maximum(codes - 1, 0)]
+        if (codes == 0).any():
+            return np.where(codes == 0, np.nan, decoded)
+        return decoded
+
+    return pd.DataFrame({
+        'dia': (day_offset + first_day).astype('datetime64[D]').astype(str),
+        'hora': np.where(hour < 0, np.nan, hour) if (hour < 0).any() else hour,
+        MACHINE_FIELD: decode(MACHINE_FIELD, machine_code),
+        CLIENT_FIELD: decode(CLIENT_FIELD, client_code),
+        'registros': np.bincount(ids, minlength=n_groups),
+        'pecas_entrada': pecas_entrada,
+        'pecas_saida': pecas_saida,
+        'ef_entrada_soma': ef_entrada_soma,
+        'ef_entrada_n': ef_entrada_n,
+        'ef_saida_soma': ef_saida_soma,
+        'ef_saida_n': ef_saida_n,
+        'utilizacao_soma': utilizacao_soma,
+        'utilizacao_n': utilizacao_n
+    })
@@ -1,10 +1,21 @@
 # Configurações do banco de dados
 
 # Tipo de banco de dados (sqlite, mysql, postgresql, sqlserver)
+# Com 'sqlite' o arquivo é baixado do Google Drive; nos demais o dashboard consulta o banco da planta
 DB_TYPE = 'sqlite'
 
 # Configurações para SQLite
 DB_PATH = 'dstechBD.db'  # Nome do arquivo local após download
+ROLLUP_DB_PATH = 'dstechBD_rollups.db'  # Tabelas pré-agregadas (DADOS_HOURLY / DADOS_DAILY)
+SNAPSHOT_DIR = 'dstechBD_snapshot'  # Snapshot Parquet de DADOS particionado por mês
+# Exporta o snapshot Parquet a cada download. Ele só é lido quando não há tabelas pré-agregadas
+# nem armazenamento colunar válidos, por isso fica desligado por padrão
+SNAPSHOT_ENABLED = False
+COLSTORE_DIR = 'dstechBD_colunas'  # Colunas de DADOS em .npy (memória mapeada) ordenadas por data
+# Conexões de leitura do dashboard (reaproveitadas por thread)
+DB_MMAP_SIZE = 256 * 1024 * 1024  # Leitura do arquivo por memória mapeada (256 MB)
+DB_CACHE_SIZE_KB = 65536  # Cache de páginas por conexão (64 MB)
+DB_STATEMENT_CACHE = 256  # Consultas preparadas mantidas por conexão
 
 # URL do Google Drive para download do banco de dados
 GOOGLE_DRIVE_URL = 'https://drive.google.com/file/d/1vuJE0AxKhRrdt6gtKQnhp6pbviJvYt2H/view?usp=sharing'
@@ -14,12 +25,66 @@ GOOGLE_DRIVE_FILE_ID = '1vuJE0AxKhRrdt6gtKQnhp6pbviJvYt2H'  # ID extraído da UR
 GOOGLE_DRIVE_FILE_ID = '1vuJE0AxKhRrdt6gtKQnhp6pbviJvYt2H'  # ID do arquivo no Google Drive
 DOWNLOAD_FREQUENCY = 86400  # Frequência de download em segundos (1 dia)
 
+# Sincronização por blocos (opcional): URL do arquivo em um servidor que aceite
+# downloads parciais (cabeçalho Range) ou file:// para uma cópia local. Na origem,
+# `python delta.py dstechBD.db` gera o manifesto publicado ao lado do arquivo.
+# Com None (padrão) o arquivo inteiro é baixado do Google Drive.
+DELTA_SYNC_URL = None
+DELTA_SYNC_MANIFEST_URL = None  # Padrão: DELTA_SYNC_URL + '.manifest.json'
+DELTA_BLOCK_SIZE = 64 * 1024  # Tamanho dos blocos comparados (múltiplo da página do SQLite)
+DELTA_MAX_RANGE_BLOCKS = 256  # Máximo de blocos vizinhos baixados em uma única requisição
+
 # Configuração da frequência de download (em segundos)
 # 0 = apenas se o arquivo não existir (nPODE INICIALIão baixa novamente)
 # 3600 = a cada hora
 # 86400 = a cada dia (24 horas)
 # 604800 = a cada semana
 
+# Agendador da atualização do banco de dados (roda em todos os workers; só um baixa por vez)
+SYNC_ENABLED = True
+SYNC_POLL_INTERVAL = 60  # Intervalo entre verificações da idade do arquivo, em segundos
+SYNC_JITTER = 0.05  # Fração aleatória somada a DOWNLOAD_FREQUENCY para não baixar todos juntos
+SYNC_RETRY_MIN = 60  # Espera após a primeira falha, dobrando a cada nova falha
+SYNC_RETRY_MAX = 3600  # Espera máxima entre tentativas após falhas
+SYNC_LOCK_PATH = 'dstechBD.sync.lock'  # Trava entre processos (apenas um worker baixa por vez)
+
+# Cache de resultados do dashboard (por combinação de filtros)
+# 'sqlite' = compartilhado entre os workers do gunicorn; 'memory' = um cache por processo
+RESULT_CACHE_BACKEND = 'sqlite'
+RESULT_CACHE_PATH = 'dashboard_cache.db'  # Arquivo do cache compartilhado
+RESULT_CACHE_TTL = 3600  # Validade de cada resultado em segundos
+RESULT_CACHE_MAX_ENTRIES = 1024  # Quantidade máxima de resultados (gráficos, KPIs, agregados) em cache
+RESULT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Limite de memória do cache (64 MB)
+
+# Conjuntos de dados filtrados mantidos em memória por worker (compartilhados entre callbacks)
+DATASET_STORE_MAX_ENTRIES = 32
+DATASET_STORE_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+# Linhas por página da tabela de dados detalhados (cada página é consultada no banco)
+DETAIL_PAGE_SIZE = 10
+
+# Tamanho das respostas enviadas ao navegador
+FIGURE_DECIMALS = 2  # Casas decimais dos dados dos gráficos
+PAYLOAD_BUDGET_BYTES = 48 * 1024  # Limite por resposta de callback (antes da compressão); acima dele é registrado um aviso
+COMPRESS_MIN_BYTES = 1024  # Respostas menores não são comprimidas
+COMPRESS_LEVEL = 6  # Nível de compressão (gzip ou brotli, se instalado)
+
+# Conexões com bancos em servidor (MySQL, PostgreSQL, SQL Server). Requerem o driver
+# correspondente instalado: pymysql, psycopg2 ou pyodbc
+DB_POOL_SIZE = 5  # Conexões abertas por worker
+DB_POOL_TIMEOUT = 30  # Espera máxima por uma conexão livre, em segundos
+DB_POOL_MAX_LIFETIME = 1800  # Conexões mais velhas que isso são fechadas e reabertas (segundos)
+DB_POOL_MAX_IDLE = 300  # Conexões ociosas por mais tempo que isso são fechadas (segundos)
+DB_POOL_PRE_PING = True  # Testa a conexão ociosa (SELECT 1) antes de entregá-la
+DB_POOL_SLOW_ACQUIRE = 0.5  # Esperas maiores que isso (segundos) são registradas no log
+
+# Períodos longos sem tabelas pré-agregadas são carregados em janelas, com os
+# gráficos atualizados a cada janela concluída
+STREAM_MIN_DAYS = 92  # Períodos com mais dias que isso são carregados em janelas
+STREAM_WINDOW_DAYS = 31  # Tamanho de cada janela, em dias
+STREAM_POLL_INTERVAL_MS = 750  # Intervalo de atualização dos gráficos durante o carregamento
+STREAM_MAX_JOBS = 8  # Carregamentos concluídos mantidos por worker
+
 # Configurações para MySQL/MariaDB
 MYSQL_CONFIG = {
     'host': 'localhost',     # Endereço do servidor
@@ -57,6 +122,10 @@ MACHINE_FIELD = 'MAQUINA'
 CLIENT_FIELD = 'LINHA'
 PIECES_IN_FIELD = 'PECAS_TOT_ENT'
 PIECES_OUT_FIELD = 'PECAS_TOT_SAI'
+EFFICIENCY_IN_FIELD = 'EF_ENTRADA'
+EFFICIENCY_OUT_FIELD = 'EF_SAIDA'
+OPERATION_TIME_FIELD = 'TEMPO_MAQ_LIGADA'
+IDLE_TIME_FIELD = 'TEMPO_MAQ_PARADA'
 # Como não existem as colunas EFICIENCIA e UTILIZACAO, vamos usar cálculos baseados em outras colunas
 # EFICIENCIA será calculada como (EF_ENTRADA + EF_SAIDA) / 2
 EFFICIENCY_FIELD_CALC = True  # Indica que o campo precisa ser calculado
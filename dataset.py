@@ -0,0 +1,69 @@
+import time
+from aggregates import DashboardAggregates, FRAME_COLUMNS, aggregate_frame, query_aggregates, query_detail_rows, query_detail_count
+from rollups import rollups_current, supports_filters, query_rollup_aggregates
+from colstore import colstore_current, colstore_groups
+from snapshot import snapshot_current, read_snapshot
+from backends import create_backend
+from db import read_connection
+from config import DB_PATH, ROLLUP_DB_PATH, SNAPSHOT_ENABLED, DETAIL_PAGE_SIZE
+
+# Banco de dados configurado em DB_TYPE (arquivo SQLite local ou banco da planta)
+backend = create_backend()
+
+
+def load_aggregates(filters):
+    """Carrega os agregados do dashboard, preferindo as tabelas pré-agregadas
+
+    O armazenamento colunar atende os filtros de faixa de eficiência e
+    utilização (que as tabelas pré-agregadas não têm) e qualquer consulta
+    enquanto as tabelas pré-agregadas estiverem desatualizadas.
+    """
+    inicio = time.time()
+    if backend.name != 'sqlite':
+        # Banco em servidor: a agregação roda diretamente no banco da planta
+        source = backend.name
+        with backend.connection() as conn:
+            aggregates = query_aggregates(conn, filters, backend)
+    elif supports_filters(filters) and rollups_current(DB_PATH, ROLLUP_DB_PATH):
+        source = 'pré-agregado'
+        aggregates = query_rollup_aggregates(read_connection(ROLLUP_DB_PATH), filters)
+    elif colstore_current(DB_PATH):
+        # Colunas .npy com memória mapeada: busca binária no período e bincount por grupo
+        # (filtros de faixa ou tabelas pré-agregadas desatualizadas)
+        source = 'armazenamento colunar'
+        aggregates = DashboardAggregates(colstore_groups(filters))
+    elif SNAPSHOT_ENABLED and snapshot_current(DB_PATH):
+        # Lê do snapshot Parquet apenas as colunas e partições do período
+        source = 'snapshot Parquet'
+        aggregates = DashboardAggregates(aggregate_frame(read_snapshot(filters, FRAME_COLUMNS)))
+    else:
+        # Sem tabelas pré-agregadas nem snapshot válidos: agrega diretamente sobre DADOS
+        source = 'DADOS'
+        with backend.connection() as conn:
+            aggregates = query_aggregates(conn, filters, backend)
+    print(f"Agregados carregados de {source} em {(time.time() - inicio) * 1000:.0f} ms")
+    return aggregates
+
+
+def fast_source_available(filters):
+    """Indica se os filtros são atendidos por tabelas pré-agregadas ou colunas mapeadas válidas (consultas rápidas)"""
+    if backend.name != 'sqlite':
+        return False
+    return (supports_filters(filters) and rollups_current(DB_PATH, ROLLUP_DB_PATH)) or colstore_current(DB_PATH)
+
+
+def load_detail_rows(filters, page=0, page_size=DETAIL_PAGE_SIZE, sort_by=None, filter_query=None):
+    """Carrega uma página das linhas brutas da tabela de dados detalhados"""
+    with backend.connection() as conn:
+        return query_detail_rows(conn, filters, page, page_size, sort_by, filter_query, backend)
+
+
+def load_detail_count(filters, filter_query=None):
+    """Conta as linhas da tabela de dados detalhados"""
+    with backend.connection() as conn:
+        return query_detail_count(conn, filters, filter_query, backend)
+
+
+def load_dataset(filters):
+    """Carrega os agregados e a primeira página das linhas detalhadas de uma combinação de filtros"""
+    return load_aggregates(filters), load_detail_rows(filters)
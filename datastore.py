@@ -0,0 +1,130 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from config import DATASET_STORE_MAX_ENTRIES, DATASET_STORE_MAX_BYTES
+
+
+def dataset_key(filters, db_version):
+    """Hash dos filtros e da versão do banco, usado como identificador do conjunto de dados"""
+    payload = json.dumps([asdict(filters), db_version], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+class Dataset:
+    """Dados filtrados do dashboard, materializados uma única vez por combinação de filtros"""
+
+    def __init__(self, key, filters, aggregates, detail_rows):
+        self.key = key
+        self.filters = filters
+        self.aggregates = aggregates
+        self.detail_rows = detail_rows
+
+    @property
+    def size_bytes(self):
+        """Memória aproximada ocupada pelos DataFrames do conjunto"""
+        size = int(self.aggregates.groups.memory_usage(deep=True).sum())
+        if self.aggregates.weekday_hour is not None:
+            size += int(self.aggregates.weekday_hour.memory_usage(deep=True).sum())
+        return size + int(self.detail_rows.memory_usage(deep=True).sum())
+
+
+class DatasetStore:
+    """Armazena no servidor os conjuntos de dados filtrados, indexados pelo hash dos filtros
+
+    Os callbacks irmãos (gráficos, KPIs e tabela) recebem apenas o hash pelo
+    navegador e buscam aqui o conjunto já materializado. Requisições
+    simultâneas para o mesmo hash esperam a primeira terminar em vez de
+    consultar o banco de novo. Quando informado, `shared_cache` serve de
+    segundo nível para conjuntos materializados por outros workers.
+    """
+
+    def __init__(self, loader, shared_cache=None,
+                 max_entries=DATASET_STORE_MAX_ENTRIES, max_bytes=DATASET_STORE_MAX_BYTES):
+        self.loader = loader
+        self.shared_cache = shared_cache
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, dataset):
+        """Armazena um conjunto já materializado"""
+        size = dataset.size_bytes
+        with self._lock:
+            old = self._entries.pop(dataset.key, None)
+            if old is not None:
+                self.size_bytes -= old[1]
+            self._entries[dataset.key] = (dataset, size)
+            self.size_bytes += size
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size_bytes -= evicted_size
+
+    def peek(self, filters, db_version):
+        """Retorna o conjunto se já estiver materializado (aqui ou em outro worker), sem carregá-lo"""
+        key = dataset_key(filters, db_version)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[0]
+        if self.shared_cache is not None:
+            dataset = self.shared_cache.get(('conjunto', key))
+            if dataset is not None:
+                self.put(dataset)
+                return dataset
+        return None
+
+    def add(self, dataset, duration=0.0):
+        """Armazena um conjunto materializado fora do get_or_create (também no cache compartilhado)"""
+        self.put(dataset)
+        if self.shared_cache is not None:
+            self.shared_cache.set(('conjunto', dataset.key), dataset, duration)
+
+    def get_or_create(self, filters, db_version):
+        """Retorna o conjunto de dados dos filtros, materializando-o apenas uma vez"""
+        key = dataset_key(filters, db_version)
+        entry = self._lookup(key)
+        if entry is not None:
+            return entry[0]
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Outro callback pode ter materializado o conjunto enquanto esperávamos
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[0]
+
+            shared_key = ('conjunto', key)
+            dataset = self.shared_cache.get(shared_key) if self.shared_cache is not None else None
+            if dataset is None:
+                inicio = time.time()
+                aggregates, detail_rows = self.loader(filters)
+                dataset = Dataset(key, filters, aggregates, detail_rows)
+                if self.shared_cache is not None:
+                    self.shared_cache.set(shared_key, dataset, time.time() - inicio)
+            self.put(dataset)
+
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return dataset
+
+    def clear(self):
+        """Remove todos os conjuntos armazenados"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
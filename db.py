@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from config import DB_MMAP_SIZE, DB_CACHE_SIZE_KB, DB_STATEMENT_CACHE
+
+_local = threading.local()
+
+
+def _file_identity(path):
+    """Identifica o arquivo no disco; muda quando ele é substituído ou reescrito"""
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def _connect(path, immutable):
+    uri = f"file:{os.path.abspath(path)}?mode=ro"
+    if immutable:
+        # Sem travas nem verificação de alterações: só para arquivos que não são
+        # modificados no lugar (a troca do arquivo é detectada por _file_identity)
+        uri += "&immutable=1"
+    conn = sqlite3.connect(uri, uri=True, cached_statements=DB_STATEMENT_CACHE)
+    conn.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def read_connection(path, immutable=False):
+    """Conexão somente leitura reaproveitada pela thread (e pelo processo)
+
+    A conexão é mantida entre os callbacks, de modo que as consultas com
+    parâmetros ficam preparadas no cache de instruções do sqlite3. Quando o
+    arquivo muda (novo download, índices criados), a conexão é reaberta.
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None or _local.pid != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    identity = _file_identity(path)
+    entry = connections.get(path)
+    if entry is not None and entry[1] == identity and entry[2] == immutable:
+        return entry[0]
+    if entry is not None:
+        entry[0].close()
+    conn = _connect(path, immutable)
+    connections[path] = (conn, identity, immutable)
+    return conn
+
+
+def read_frame(conn, query, params=(), label=None):
+    """Executa a consulta com parâmetros e registra o tempo gasto"""
+    inicio = time.time()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, list(params))
+        columns = [column[0] for column in cursor.description]
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+    finally:
+        cursor.close()
+    if label:
+        print(f"Consulta '{label}': {len(df)} linhas em {(time.time() - inicio) * 1000:.0f} ms")
+    return df
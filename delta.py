@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import urllib.parse
+import urllib.request
+from config import DELTA_SYNC_URL, DELTA_SYNC_MANIFEST_URL, DELTA_BLOCK_SIZE, DELTA_MAX_RANGE_BLOCKS
+
+# Sincronização por blocos do arquivo SQLite (no estilo do zsync): a origem publica,
+# junto com o arquivo, um manifesto com o hash de cada bloco de tamanho fixo. O
+# cliente compara com os blocos do arquivo local e baixa só os que mudaram. Como o
+# SQLite grava por páginas, novos registros alteram poucos blocos do arquivo.
+
+
+def block_hashes(path, block_size=DELTA_BLOCK_SIZE):
+    """Hash SHA-1 de cada bloco do arquivo"""
+    hashes = []
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return hashes
+            hashes.append(hashlib.sha1(block).hexdigest())
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_manifest(path, block_size=DELTA_BLOCK_SIZE):
+    """Manifesto publicado junto com o arquivo na origem"""
+    return {
+        'tamanho': os.path.getsize(path),
+        'bloco': block_size,
+        'sha256': file_sha256(path),
+        'blocos': block_hashes(path, block_size)
+    }
+
+
+def _read_url(url, start=None, end=None):
+    """Lê uma URL inteira ou o intervalo de bytes [start, end)
+
+    URLs file:// (ou caminhos locais) permitem testar contra uma cópia local
+    da origem; URLs http(s) usam o cabeçalho Range.
+    """
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme in ('', 'file'):
+        path = urllib.request.url2pathname(parsed.path) if parsed.scheme else url
+        with open(path, 'rb') as f:
+            if start is None:
+                return f.read()
+            f.seek(start)
+            return f.read(end - start)
+
+    request = urllib.request.Request(url)
+    if start is not None:
+        request.add_header('Range', f'bytes={start}-{end - 1}')
+    with urllib.request.urlopen(request, timeout=60) as response:
+        if start is not None and response.status != 206:
+            raise ValueError(f"Servidor não aceita downloads parciais (HTTP {response.status})")
+        return response.read()
+
+
+def _changed_ranges(local_hashes, manifest):
+    """Intervalos de blocos diferentes do local, agrupando blocos vizinhos"""
+    changed = [
+        i for i, remote in enumerate(manifest['blocos'])
+        if i >= len(local_hashes) or local_hashes[i] != remote
+    ]
+    ranges = []
+    for i in changed:
+        if ranges and ranges[-1][1] == i and ranges[-1][1] - ranges[-1][0] < DELTA_MAX_RANGE_BLOCKS:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+    return ranges
+
+
+def delta_download(local_path, target_path, url=DELTA_SYNC_URL, manifest_url=DELTA_SYNC_MANIFEST_URL):
+    """Monta em `target_path` a versão atual da origem a partir do arquivo local
+
+    Baixa apenas os blocos que diferem do manifesto e confere o SHA-256 do
+    resultado. O arquivo local não é alterado.
+    """
+    inicio = time.time()
+    manifest = json.loads(_read_url(manifest_url or url + '.manifest.json'))
+    block_size = manifest['bloco']
+    size = manifest['tamanho']
+
+    ranges = _changed_ranges(block_hashes(local_path, block_size), manifest)
+    shutil.copyfile(local_path, target_path)
+    downloaded = 0
+    with open(target_path, 'r+b') as f:
+        f.truncate(size)
+        for first, last in ranges:
+            start, end = first * block_size, min(last * block_size, size)
+            data = _read_url(url, start, end)
+            if len(data) != end - start:
+                raise ValueError(f"Bloco incompleto recebido ({len(data)} de {end - start} bytes)")
+            f.seek(start)
+            f.write(data)
+            downloaded += len(data)
+
+    if file_sha256(target_path) != manifest['sha256']:
+        os.remove(target_path)
+        raise ValueError("Arquivo montado não confere com o SHA-256 do manifesto")
+
+    blocks = sum(last - first for first, last in ranges)
+    print(
+        f"Sincronização por blocos: {blocks} de {len(manifest['blocos'])} blocos baixados "
+        f"({downloaded / 1024 / 1024:.1f} MB de {size / 1024 / 1024:.1f} MB, {time.time() - inicio:.1f}s)"
+    )
+    return downloaded
+
+
+if __name__ == '__main__':
+    # Gera o manifesto a ser publicado na origem ao lado do arquivo:
+    #   python delta.py dstechBD.db  ->  dstechBD.db.manifest.json
+    source = sys.argv[1] if len(sys.argv) > 1 else 'dstechBD.db'
+    with open(source + '.manifest.json', 'w') as f:
+        json.dump(build_manifest(source), f)
+    print(f"Manifesto gerado: {source}.manifest.json")
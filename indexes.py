@@ -0,0 +1,127 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from aggregates import DashboardFilters, aggregate_query, detail_query
+from config import (
+    DB_PATH, TABLE_NAME, DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+    OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+)
+
+# Índices criados após o download. O índice por data segue a ordem padrão da tabela de
+# dados detalhados (DETAIL_ORDER), para que cada página seja lida já ordenada, e cobre todas
+# as colunas usadas na agregação, de modo que a consulta do dashboard não precisa ler a tabela.
+# Os índices por máquina e por linha seguem a mesma ordem depois da coluna filtrada.
+DASHBOARD_INDEXES = {
+    f'IDX_{TABLE_NAME}_DATA_HORA_COBERTURA': [
+        DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+        PIECES_IN_FIELD, PIECES_OUT_FIELD,
+        EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD,
+        OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+    ],
+    f'IDX_{TABLE_NAME}_MAQUINA_DATA_HORA': [MACHINE_FIELD, DATE_FIELD, TIME_FIELD, CLIENT_FIELD],
+    f'IDX_{TABLE_NAME}_LINHA_DATA_HORA': [CLIENT_FIELD, DATE_FIELD, TIME_FIELD, MACHINE_FIELD],
+}
+
+# Índices de versões anteriores, substituídos pelos de cima
+OBSOLETE_INDEXES = [
+    f'IDX_{TABLE_NAME}_DATA_COBERTURA',
+    f'IDX_{TABLE_NAME}_MAQUINA_DATA',
+    f'IDX_{TABLE_NAME}_LINHA_DATA',
+]
+
+
+def missing_indexes(db_path=DB_PATH):
+    """Índices do dashboard que ainda não existem no arquivo"""
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (TABLE_NAME,)
+            )
+        }
+    finally:
+        conn.close()
+    return [name for name in DASHBOARD_INDEXES if name not in existing]
+
+
+def create_indexes(db_path=DB_PATH):
+    """Cria os índices do dashboard que ainda não existem e atualiza as estatísticas"""
+    missing = missing_indexes(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+        created = []
+        for name in missing:
+            inicio = time.time()
+            conn.execute(f"CREATE INDEX {name} ON {TABLE_NAME} ({', '.join(DASHBOARD_INDEXES[name])})")
+            created.append(name)
+            print(f"Índice {name} criado ({time.time() - inicio:.1f}s)")
+
+        # ANALYZE só é necessário quando o conjunto de índices muda
+        if created:
+            conn.execute("ANALYZE")
+        conn.commit()
+        return created
+    finally:
+        conn.close()
+
+
+def dashboard_queries():
+    """Consultas representativas do dashboard, como são executadas
+
+    Agregação e primeira página da tabela de dados detalhados (ordem padrão),
+    com filtro por data, máquina, cliente e faixas de eficiência/utilização.
+    """
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=30)
+    period = dict(start_date=str(start_date), end_date=str(end_date))
+
+    queries = {}
+    for label, filters in {
+        'período': DashboardFilters(**period),
+        'período + máquina': DashboardFilters(machine='1', **period),
+        'período + cliente': DashboardFilters(client='1', **period),
+        'período + faixas': DashboardFilters(efficiency='high', utilization='low', **period),
+    }.items():
+        queries[f'agregação ({label})'] = aggregate_query(filters)
+        queries[f'dados detalhados ({label})'] = detail_query(filters)
+    return queries
+
+
+def check_query_plans(db_path=DB_PATH):
+    """Confere com EXPLAIN QUERY PLAN se as consultas do dashboard usam índices
+
+    Retorna as consultas que ainda percorrem a tabela inteira ou que, na tabela
+    de dados detalhados, ordenam todas as linhas filtradas a cada página.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        problems = []
+        for label, (query, params) in dashboard_queries().items():
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            details = [row[-1] for row in plan]
+            if any(detail.startswith('SCAN') and TABLE_NAME in detail for detail in details):
+                problems.append(label)
+                print(f"Aviso: a consulta '{label}' percorre a tabela {TABLE_NAME} inteira: {'; '.join(details)}")
+            elif label.startswith('dados detalhados') and any('ORDER BY' in detail for detail in details):
+                problems.append(label)
+                print(f"Aviso: a consulta '{label}' ordena sem índice: {'; '.join(details)}")
+        return problems
+    finally:
+        conn.close()
+
+
+def prepare_database_indexes(db_path=DB_PATH):
+    """Etapa pós-download: cria índices, roda ANALYZE e verifica os planos de consulta"""
+    try:
+        create_indexes(db_path)
+        if not check_query_plans(db_path):
+            print("Planos de consulta do dashboard: OK (índices utilizados)")
+        return True
+    except Exception as e:
+        print(f"Erro ao preparar índices do banco de dados: {str(e)}")
+        return False
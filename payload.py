@@ -0,0 +1,200 @@
+import base64
+import gzip
+import hashlib
+import threading
+import numpy as np
+from dash import Patch, no_update
+from flask import request
+from plotly.offline import get_plotlyjs_version
+from plotly.utils import PlotlyJSONEncoder
+from config import FIGURE_DECIMALS, PAYLOAD_BUDGET_BYTES, COMPRESS_MIN_BYTES, COMPRESS_LEVEL
+from backends import current_callback
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Vetores a partir deste tamanho vão como typed arrays (base64), se o plotly.js aceitar
+TYPED_ARRAY_MIN_LENGTH = 16
+# Campos dos traços com os dados dos gráficos
+DATA_KEYS = ('x', 'y', 'z', 'values')
+# Campos dos traços reenviados por Patch quando só os dados do gráfico mudam
+PATCH_KEYS = DATA_KEYS + ('labels',)
+# Tipos de resposta comprimidos (JSON dos callbacks, HTML e scripts)
+COMPRESSIBLE_TYPES = ('application/json', 'text/html', 'text/css', 'application/javascript', 'text/javascript')
+
+
+def _typed_arrays_supported():
+    """O formato {dtype, bdata} só é entendido pelo plotly.js 2.28 em diante"""
+    major, minor = (int(part) for part in get_plotlyjs_version().split('.')[:2])
+    return (major, minor) >= (2, 28)
+
+
+TYPED_ARRAYS = _typed_arrays_supported()
+
+
+def _typed_array(values, dtype):
+    return {'dtype': dtype, 'bdata': base64.b64encode(values.astype(dtype).tobytes()).decode('ascii')}
+
+
+def _compact_values(values, decimals):
+    """Dados de um traço em formato compacto: floats arredondados, inteiros e datas curtas"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype('datetime64[D]')
+        # Datas sem hora vão como YYYY-MM-DD
+        unit = 'D' if (days == values).all() else 's'
+        return np.datetime_as_string(values, unit=unit).tolist()
+    if values.dtype.kind not in 'biuf':
+        return values.tolist()
+
+    values = values.astype(np.float64)
+    finite = values[np.isfinite(values)]
+    integral = len(finite) == len(values) and (np.mod(finite, 1) == 0).all()
+    if integral and np.abs(finite).max(initial=0) <= np.iinfo(np.int32).max:
+        if TYPED_ARRAYS and len(values) >= TYPED_ARRAY_MIN_LENGTH:
+            return _typed_array(values, 'i4')
+        return values.astype(np.int64).tolist()
+
+    values = np.round(values, decimals)
+    if TYPED_ARRAYS and len(values) >= TYPED_ARRAY_MIN_LENGTH:
+        return _typed_array(values, 'f8')
+    # NaN vira null no JSON
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def compact_figure(fig, decimals=FIGURE_DECIMALS):
+    """Figura como dicionário pronto para o dcc.Graph, com os dados em formato compacto
+
+    Os valores são arredondados para `decimals` casas (o gráfico não mostra
+    mais que isso), inteiros perdem o ".0" e datas sem hora perdem o
+    "T00:00:00". Com plotly.js 2.28 ou mais recente, vetores longos vão como
+    typed arrays em base64.
+    """
+    figure = fig.to_plotly_json()
+    for trace in figure.get('data', []):
+        for key in DATA_KEYS:
+            if key in trace and trace[key] is not None and not isinstance(trace[key], dict):
+                trace[key] = _compact_values(trace[key], decimals)
+    return figure
+
+
+def _digest(value):
+    return hashlib.sha1(PlotlyJSONEncoder().encode(value).encode('utf-8')).hexdigest()[:16]
+
+
+def figure_digest(figure):
+    """Hashes de uma figura compacta: um da estrutura (layout e atributos dos traços) e um por campo de dados"""
+    traces = figure.get('data', [])
+    structure = dict(figure, data=[
+        {key: None if key in PATCH_KEYS else value for key, value in trace.items()} for trace in traces
+    ])
+    return {
+        'estrutura': _digest(structure),
+        'dados': [{key: _digest(trace[key]) for key in PATCH_KEYS if key in trace} for trace in traces]
+    }
+
+
+def figure_update(figure, previous):
+    """Saída de um dcc.Graph e o novo hash, a partir do hash da figura que o navegador já tem
+
+    Figura igual à anterior: no_update. Mesma estrutura com dados diferentes
+    (caso comum ao mudar o período): um Patch só com os campos de dados
+    alterados (x, y, z, values, labels). Caso contrário, a figura completa.
+    """
+    if figure is no_update:
+        return no_update, no_update
+    digest = figure_digest(figure)
+    if previous == digest:
+        return no_update, no_update
+    if not previous or previous.get('estrutura') != digest['estrutura']:
+        return figure, digest
+
+    patch = Patch()
+    for index, (trace, old, new) in enumerate(zip(figure['data'], previous['dados'], digest['dados'])):
+        for key, value in new.items():
+            if old.get(key) != value:
+                patch['data'][index][key] = trace[key]
+    return patch, digest
+
+
+def unchanged_outputs(values, current):
+    """Troca por no_update os valores iguais aos que já estão na página (`current`)"""
+    if values is no_update:
+        return values
+    return [no_update if value == shown else value for value, shown in zip(values, current)] if current else values
+
+
+class PayloadMonitor:
+    """Tamanho das respostas dos callbacks, com limite (PAYLOAD_BUDGET_BYTES) por resposta
+
+    Registra, por callback, o tamanho da resposta antes e depois da
+    compressão e avisa quando uma resposta passa do limite.
+    """
+
+    def __init__(self, budget=PAYLOAD_BUDGET_BYTES):
+        self.budget = budget
+        self._lock = threading.Lock()
+        self._callbacks = {}
+
+    def record(self, callback, size, sent):
+        with self._lock:
+            entry = self._callbacks.setdefault(callback, {
+                'respostas': 0, 'bytes': 0, 'bytes_enviados': 0, 'maior': 0, 'acima_do_limite': 0
+            })
+            entry['respostas'] += 1
+            entry['bytes'] += size
+            entry['bytes_enviados'] += sent
+            entry['maior'] = max(entry['maior'], size)
+            if size > self.budget:
+                entry['acima_do_limite'] += 1
+        if size > self.budget:
+            print(f"Aviso: resposta de {size / 1024:.0f} KB acima do limite de "
+                  f"{self.budget / 1024:.0f} KB (callback: {callback})")
+
+    def stats(self):
+        """Tamanho médio e maior resposta de cada callback"""
+        with self._lock:
+            result = {}
+            for callback, entry in self._callbacks.items():
+                result[callback] = dict(
+                    entry,
+                    media=round(entry['bytes'] / entry['respostas']),
+                    media_enviada=round(entry['bytes_enviados'] / entry['respostas'])
+                )
+            return {'limite_bytes': self.budget, 'callbacks': result}
+
+
+def _compress(response):
+    """Comprime a resposta com brotli ou gzip, conforme o navegador aceitar"""
+    accepted = request.headers.get('Accept-Encoding', '')
+    data = response.get_data()
+    if brotli is not None and 'br' in accepted:
+        body, encoding = brotli.compress(data, quality=COMPRESS_LEVEL), 'br'
+    elif 'gzip' in accepted:
+        body, encoding = gzip.compress(data, compresslevel=COMPRESS_LEVEL), 'gzip'
+    else:
+        return
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(body))
+    response.vary.add('Accept-Encoding')
+
+
+def install_payload_hooks(server, monitor):
+    """Mede as respostas dos callbacks e comprime as respostas de texto do servidor Flask"""
+    @server.after_request
+    def compress_response(response):
+        if response.direct_passthrough or response.status_code < 200 or response.status_code >= 300:
+            return response
+        if 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        size = response.content_length or len(response.get_data())
+        if size >= COMPRESS_MIN_BYTES:
+            _compress(response)
+        if request.path.endswith('_dash-update-component'):
+            monitor.record(current_callback(), size, response.content_length or size)
+        return response
+
+    return compress_response
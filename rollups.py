@@ -0,0 +1,269 @@
+import os
+import json
+import sqlite3
+import time
+from aggregates import (
+    DashboardAggregates, build_conditions,
+    AGGREGATE_COLUMNS, DAY_EXPR, HOUR_EXPR, GROUP_SUMS
+)
+from db import read_connection, read_frame
+from config import (
+    TABLE_NAME, DATE_FIELD, MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD, OPERATION_TIME_FIELD, IDLE_TIME_FIELD,
+    DB_PATH, ROLLUP_DB_PATH
+)
+
+HOURLY_TABLE = 'DADOS_HOURLY'
+DAILY_TABLE = 'DADOS_DAILY'
+META_TABLE = 'ROLLUP_META'
+# Versão do formato das tabelas (tabelas de outro formato são reconstruídas)
+ROLLUP_FORMAT = 3
+
+# Nomes dos dias da semana na ordem do strftime('%w') (0 = domingo), iguais ao day_name() do pandas
+WEEKDAY_NAMES = ['Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+
+SUM_COLUMNS = ", ".join(f"SUM({c}) AS {c}" for c in GROUP_SUMS)
+COUNT_COLUMNS = ", ".join(
+    f"{c} INTEGER" if c == 'registros' or c.endswith('_n') else f"{c} REAL" for c in GROUP_SUMS
+)
+
+
+def source_signature(db_path=DB_PATH):
+    """Identifica a versão do arquivo de origem (tamanho e data de modificação)"""
+    stat = os.stat(db_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# Mês (YYYY-MM) de cada registro: unidade de verificação e de reconstrução do histórico
+MONTH_EXPR = f"substr({DATE_FIELD}, 1, 7)"
+
+# Checksum de um mês: contagem e somas de cada coluna usada nas tabelas (inclusive dia e hora)
+CHECKSUM_EXPRS = ["1", f"CAST(substr({DATE_FIELD}, 9, 2) AS INTEGER)", HOUR_EXPR] + [
+    MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD, PIECES_OUT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD, OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+]
+
+
+def _month_checksums(conn, high_water, last_rowid):
+    """Checksum de cada mês de DADOS até a marca d'água e até `last_rowid`, em uma passada pela tabela
+
+    Retorna dois dicionários mês -> checksum: o do histórico já agregado
+    (rowid <= high_water) e o de todos os registros até `last_rowid`.
+    """
+    history = ", ".join(f"TOTAL(CASE WHEN rowid <= :marca THEN {e} END)" for e in CHECKSUM_EXPRS)
+    current = ", ".join(f"TOTAL({e})" for e in CHECKSUM_EXPRS)
+    rows = conn.execute(
+        f"""SELECT COALESCE({MONTH_EXPR}, ''), {history}, {current}
+            FROM origem.{TABLE_NAME}
+            WHERE rowid <= :ultimo
+            GROUP BY 1""",
+        {'marca': high_water, 'ultimo': last_rowid}
+    ).fetchall()
+    size = len(CHECKSUM_EXPRS)
+    # Ida e volta pelo JSON, para comparar com o que foi gravado nos metadados
+    checksums = json.loads(json.dumps([
+        (month, values[:size], values[size:]) for month, *values in rows
+    ]))
+    return (
+        {month: old for month, old, _ in checksums if old[0]},
+        {month: new for month, _, new in checksums}
+    )
+
+
+def _read_meta(conn):
+    """Lê os metadados das tabelas pré-agregadas"""
+    return dict(conn.execute(f"SELECT chave, valor FROM {META_TABLE}").fetchall())
+
+
+def _write_meta(conn, db_path, high_water, checksums):
+    """Grava a marca d'água e o checksum de cada mês do histórico agregado"""
+    meta = {
+        'formato': str(ROLLUP_FORMAT),
+        'origem_assinatura': source_signature(db_path),
+        'ultimo_rowid': str(high_water),
+        'meses_checksum': json.dumps(checksums)
+    }
+    conn.executemany(f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?)", meta.items())
+
+
+def _insert_groups(conn, table, keys, where, params):
+    """Agrega os registros de DADOS que atendem `where` e soma ao conteúdo da tabela"""
+    updates = ", ".join(f"{c} = {c} + excluded.{c}" for c in GROUP_SUMS)
+    key_names = ", ".join(name for _, name in keys)
+    key_exprs = ", ".join(expr for expr, _ in keys)
+    positions = ", ".join(str(i + 1) for i in range(len(keys)))
+    conn.execute(
+        f"""INSERT INTO {table} ({key_names}, {", ".join(GROUP_SUMS)})
+            SELECT {key_exprs}, {AGGREGATE_COLUMNS}
+            FROM origem.{TABLE_NAME}
+            WHERE {where}
+            GROUP BY {positions}
+            ON CONFLICT ({key_names}) DO UPDATE SET {updates}""",
+        params
+    )
+
+
+def _merge_rows(conn, where, params):
+    """Soma os registros de DADOS que atendem `where` às tabelas por hora e por dia"""
+    day = (DAY_EXPR, 'dia')
+    hour = (HOUR_EXPR, 'hora')
+    machine = (MACHINE_FIELD, MACHINE_FIELD)
+    client = (CLIENT_FIELD, CLIENT_FIELD)
+    # Sem as faixas de eficiência e utilização nas chaves: com elas a tabela por hora
+    # cresce cerca de dez vezes; os filtros de faixa usam o armazenamento colunar
+    _insert_groups(conn, HOURLY_TABLE, [day, hour, machine, client], where, params)
+    _insert_groups(conn, DAILY_TABLE, [day, machine, client], where, params)
+
+
+def _rebuild_months(conn, months, last_rowid):
+    """Refaz os grupos dos meses alterados a partir dos registros de DADOS até `last_rowid`"""
+    for month in months:
+        for table in (HOURLY_TABLE, DAILY_TABLE):
+            conn.execute(f"DELETE FROM {table} WHERE COALESCE(substr(dia, 1, 7), '') = ?", (month,))
+        _merge_rows(conn, f"rowid <= ? AND COALESCE({MONTH_EXPR}, '') = ?", (last_rowid, month))
+
+
+def build_rollups(db_path=DB_PATH, rollup_path=ROLLUP_DB_PATH):
+    """Reconstrói as tabelas pré-agregadas por hora e por dia a partir de DADOS"""
+    inicio = time.time()
+    tmp_path = rollup_path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("ATTACH DATABASE ? AS origem", (db_path,))
+        conn.executescript(f"""
+            CREATE TABLE {HOURLY_TABLE} (
+                dia TEXT, hora INTEGER, {MACHINE_FIELD} INTEGER, {CLIENT_FIELD} INTEGER,
+                {COUNT_COLUMNS}
+            );
+            CREATE TABLE {DAILY_TABLE} (
+                dia TEXT, {MACHINE_FIELD} INTEGER, {CLIENT_FIELD} INTEGER,
+                {COUNT_COLUMNS}
+            );
+            CREATE TABLE {META_TABLE} (chave TEXT PRIMARY KEY, valor TEXT);
+
+            CREATE UNIQUE INDEX IDX_{HOURLY_TABLE}_CHAVE ON {HOURLY_TABLE} (dia, hora, {MACHINE_FIELD}, {CLIENT_FIELD});
+            CREATE UNIQUE INDEX IDX_{DAILY_TABLE}_CHAVE ON {DAILY_TABLE} (dia, {MACHINE_FIELD}, {CLIENT_FIELD});
+        """)
+        high_water, row_count = conn.execute(
+            f"SELECT COALESCE(MAX(rowid), 0), COUNT(*) FROM origem.{TABLE_NAME}"
+        ).fetchone()
+        _merge_rows(conn, "rowid <= ?", (high_water,))
+        _write_meta(conn, db_path, high_water, _month_checksums(conn, high_water, high_water)[1])
+        conn.commit()
+    finally:
+        conn.close()
+
+    # Troca o arquivo de uma vez para que leitores nunca vejam tabelas pela metade
+    os.replace(tmp_path, rollup_path)
+    print(f"Tabelas pré-agregadas reconstruídas: {row_count} registros ({time.time() - inicio:.1f}s)")
+
+
+def update_rollups(db_path=DB_PATH, rollup_path=ROLLUP_DB_PATH):
+    """Agrega apenas os registros novos desde a última marca d'água
+
+    O histórico já agregado é conferido mês a mês (contagem e somas de cada
+    coluna); os meses com registros alterados ou removidos são refeitos.
+    Retorna False quando não há marca d'água e é necessária uma reconstrução
+    completa.
+    """
+    if not os.path.exists(rollup_path):
+        return False
+
+    inicio = time.time()
+    conn = sqlite3.connect(rollup_path, timeout=30)
+    try:
+        conn.execute("ATTACH DATABASE ? AS origem", (db_path,))
+        meta = _read_meta(conn)
+        if 'meses_checksum' not in meta or meta.get('formato') != str(ROLLUP_FORMAT):
+            return False
+        high_water = int(meta['ultimo_rowid'])
+        max_rowid = conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM origem.{TABLE_NAME}").fetchone()[0]
+        if max_rowid < high_water:
+            print("Registros do fim de DADOS removidos. Reconstrução completa necessária.")
+            return False
+
+        # Meses do histórico com registros editados, removidos ou inseridos abaixo da marca d'água
+        stored = json.loads(meta['meses_checksum'])
+        checksums, current = _month_checksums(conn, high_water, max_rowid)
+        changed = sorted(month for month in stored.keys() | checksums.keys()
+                         if stored.get(month) != checksums.get(month))
+
+        with conn:
+            if changed:
+                print(f"Histórico de DADOS alterado em {len(changed)} mês(es): {', '.join(changed)}. Refazendo...")
+                _rebuild_months(conn, changed, high_water)
+            if max_rowid > high_water:
+                _merge_rows(conn, "rowid > ?", (high_water,))
+            new_rows = conn.execute(
+                f"SELECT COUNT(*) FROM origem.{TABLE_NAME} WHERE rowid > ?", (high_water,)
+            ).fetchone()[0]
+            _write_meta(conn, db_path, max_rowid, current)
+    finally:
+        conn.close()
+
+    print(f"Tabelas pré-agregadas atualizadas: {new_rows} registros novos ({time.time() - inicio:.1f}s)")
+    return True
+
+
+def rollups_current(db_path=DB_PATH, rollup_path=ROLLUP_DB_PATH):
+    """Verifica se as tabelas pré-agregadas correspondem ao arquivo de origem atual"""
+    if not os.path.exists(rollup_path) or not os.path.exists(db_path):
+        return False
+    try:
+        meta = _read_meta(read_connection(rollup_path))
+    except sqlite3.Error:
+        return False
+    return meta.get('formato') == str(ROLLUP_FORMAT) and meta.get('origem_assinatura') == source_signature(db_path)
+
+
+def refresh_rollups(db_path=DB_PATH, rollup_path=ROLLUP_DB_PATH):
+    """Atualiza as tabelas pré-agregadas, incrementalmente quando possível"""
+    try:
+        if rollups_current(db_path, rollup_path):
+            print("Tabelas pré-agregadas já estão atualizadas.")
+            return True
+        try:
+            if update_rollups(db_path, rollup_path):
+                return True
+        except sqlite3.Error as e:
+            print(f"Atualização incremental falhou ({str(e)}). Reconstruindo...")
+        build_rollups(db_path, rollup_path)
+        return True
+    except Exception as e:
+        print(f"Erro ao construir tabelas pré-agregadas: {str(e)}")
+        return False
+
+
+def supports_filters(filters):
+    """Indica se os filtros podem ser atendidos pelas tabelas pré-agregadas
+
+    Período, máquina e linha são chaves das tabelas. Com filtro de faixa de
+    eficiência ou utilização, os agregados vêm do armazenamento colunar, que
+    tem a faixa de cada registro.
+    """
+    return filters.efficiency in (None, 'all') and filters.utilization in (None, 'all')
+
+
+def query_rollup_aggregates(conn, filters):
+    """Lê os agregados das tabelas pré-agregadas em vez dos registros brutos (ver supports_filters)"""
+    where, params = build_conditions(filters, date_column='dia')
+    groups = read_frame(
+        conn,
+        f"""SELECT dia, {MACHINE_FIELD}, {CLIENT_FIELD}, {SUM_COLUMNS}
+            FROM {DAILY_TABLE}{where}
+            GROUP BY 1, 2, 3""",
+        params, label=DAILY_TABLE
+    )
+    weekday_hour = read_frame(
+        conn,
+        f"""SELECT CAST(strftime('%w', dia) AS INTEGER) AS DiaSemana, hora AS Hora,
+                   SUM(pecas_entrada) AS {PIECES_IN_FIELD}
+            FROM {HOURLY_TABLE}{where}
+            GROUP BY 1, 2""",
+        params, label=HOURLY_TABLE
+    )
+    weekday_hour['DiaSemana'] = weekday_hour['DiaSemana'].map(dict(enumerate(WEEKDAY_NAMES)))
+    return DashboardAggregates(groups, weekday_hour)
@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import time
+from datetime import date
+import pandas as pd
+from config import (
+    DB_PATH, SNAPSHOT_DIR, SNAPSHOT_ENABLED, TABLE_NAME, DATE_FIELD, TIME_FIELD, MACHINE_FIELD, CLIENT_FIELD,
+    EFFICIENCY_IN_FIELD, EFFICIENCY_OUT_FIELD, OPERATION_TIME_FIELD, IDLE_TIME_FIELD
+)
+from aggregates import (
+    BAND_CODES, EFFICIENCY_BAND_FIELD, UTILIZATION_BAND_FIELD,
+    band_codes, efficiency_values, utilization_values
+)
+from versions import current_version, version_current, new_version_dir, publish_version, version_name
+
+# pyarrow é opcional (só o snapshot usa) e só é importado quando o snapshot é usado
+pa = None
+ds = None
+
+# Coluna de partição (mês da coluna DATA)
+PARTITION_FIELD = 'ANO_MES'
+# Versão do formato do snapshot (faz snapshots antigos serem exportados de novo)
+SNAPSHOT_FORMAT = 4
+EXPORT_CHUNK_ROWS = 500000
+
+
+def snapshot_supported():
+    """Importa a biblioteca pyarrow na primeira chamada e indica se ela está disponível"""
+    global pa, ds
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.dataset
+        except ImportError:
+            return False
+        pa, ds = pyarrow, pyarrow.dataset
+    return True
+
+
+def _arrow_schema(conn):
+    """Tipos das colunas de DADOS no snapshot, a partir dos tipos declarados no SQLite"""
+    fields = []
+    for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({TABLE_NAME})"):
+        declared = (declared or '').upper()
+        if name == DATE_FIELD:
+            arrow_type = pa.date32()
+        elif name in (MACHINE_FIELD, CLIENT_FIELD):
+            arrow_type = pa.int32()
+        elif name != TIME_FIELD and any(t in declared for t in ('INT', 'REAL', 'FLOA', 'DOUB', 'NUM', 'DEC')):
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    # Faixas de eficiência e utilização de cada registro, para os filtros de faixa
+    fields.append(pa.field(EFFICIENCY_BAND_FIELD, pa.int8()))
+    fields.append(pa.field(UTILIZATION_BAND_FIELD, pa.int8()))
+    fields.append(pa.field(PARTITION_FIELD, pa.string()))
+    return pa.schema(fields)
+
+
+def _to_arrow(series, arrow_type):
+    """Converte uma coluna do pandas para o tipo do snapshot"""
+    if arrow_type == pa.date32():
+        return pa.array(pd.to_datetime(series, format='%Y-%m-%d'), from_pandas=True).cast(arrow_type)
+    if arrow_type == pa.string() and series.dtype != object:
+        series = series.astype('string')
+    return pa.array(series, type=arrow_type, from_pandas=True)
+
+
+def _record_batches(conn, schema):
+    """Lê DADOS em blocos e converte cada bloco para o esquema do snapshot"""
+    for chunk in pd.read_sql_query(f"SELECT * FROM {TABLE_NAME}", conn, chunksize=EXPORT_CHUNK_ROWS):
+        chunk[EFFICIENCY_BAND_FIELD] = band_codes(efficiency_values(chunk[EFFICIENCY_IN_FIELD], chunk[EFFICIENCY_OUT_FIELD]))
+        chunk[UTILIZATION_BAND_FIELD] = band_codes(utilization_values(chunk[OPERATION_TIME_FIELD], chunk[IDLE_TIME_FIELD]))
+        chunk[PARTITION_FIELD] = chunk[DATE_FIELD].str.slice(0, 7)
+        arrays = [_to_arrow(chunk[field.name], field.type) for field in schema]
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def snapshot_current(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Verifica se o snapshot corresponde ao arquivo de origem atual"""
+    return snapshot_supported() and version_current(snapshot_dir, db_path, SNAPSHOT_FORMAT)
+
+
+def export_snapshot(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Exporta DADOS para Parquet particionado por mês
+
+    Cada exportação vai para um diretório próprio; o arquivo ATUAL passa a
+    apontar para ele somente no final, e as versões anteriores são removidas.
+    """
+    if not snapshot_supported():
+        raise ImportError("pyarrow não instalado (pip install -r requirements-snapshot.txt)")
+    inicio = time.time()
+    version = version_name(db_path, SNAPSHOT_FORMAT)
+    target = new_version_dir(snapshot_dir, version)
+
+    # O write_dataset consome os blocos em outra thread; a conexão só é usada por ela
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    try:
+        schema = _arrow_schema(conn)
+        ds.write_dataset(
+            _record_batches(conn, schema),
+            target,
+            schema=schema,
+            format='parquet',
+            partitioning=ds.partitioning(pa.schema([(PARTITION_FIELD, pa.string())]), flavor='hive'),
+            min_rows_per_group=EXPORT_CHUNK_ROWS
+        )
+    finally:
+        conn.close()
+
+    publish_version(snapshot_dir, version)
+    print(f"Snapshot Parquet de {TABLE_NAME} exportado em {target} ({time.time() - inicio:.1f}s)")
+
+
+def refresh_snapshot(db_path=DB_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Exporta o snapshot se estiver ausente ou desatualizado (com SNAPSHOT_ENABLED)"""
+    if not SNAPSHOT_ENABLED:
+        return False
+    if not snapshot_supported():
+        print("Biblioteca pyarrow não instalada (pip install -r requirements-snapshot.txt). Snapshot Parquet desativado.")
+        return False
+    try:
+        if snapshot_current(db_path, snapshot_dir):
+            print("Snapshot Parquet já está atualizado.")
+            return True
+        export_snapshot(db_path, snapshot_dir)
+        return True
+    except Exception as e:
+        print(f"Erro ao exportar snapshot Parquet: {str(e)}")
+        return False
+
+
+def _filter_expression(filters):
+    """Converte os filtros do dashboard em predicados do pyarrow (partições e linhas)"""
+    expression = None
+    conditions = []
+    if filters.start_date and filters.end_date:
+        start = date.fromisoformat(filters.start_date[:10])
+        end = date.fromisoformat(filters.end_date[:10])
+        conditions += [
+            ds.field(PARTITION_FIELD) >= start.strftime('%Y-%m'),
+            ds.field(PARTITION_FIELD) <= end.strftime('%Y-%m'),
+            ds.field(DATE_FIELD) >= pa.scalar(start, pa.date32()),
+            ds.field(DATE_FIELD) <= pa.scalar(end, pa.date32()),
+        ]
+    if filters.machine and filters.machine != 'all':
+        conditions.append(ds.field(MACHINE_FIELD) == int(filters.machine))
+    if filters.client and filters.client != 'all':
+        conditions.append(ds.field(CLIENT_FIELD) == int(filters.client))
+    for field, band in ((EFFICIENCY_BAND_FIELD, filters.efficiency), (UTILIZATION_BAND_FIELD, filters.utilization)):
+        if band and band != 'all':
+            conditions.append(ds.field(field) == BAND_CODES[band])
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_snapshot(filters, columns, snapshot_dir=SNAPSHOT_DIR):
+    """Lê do snapshot apenas as colunas e partições necessárias para os filtros"""
+    version = current_version(snapshot_dir)
+    dataset = ds.dataset(
+        os.path.join(snapshot_dir, version),
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([(PARTITION_FIELD, pa.string())]), flavor='hive')
+    )
+    table = dataset.to_table(columns=columns, filter=_filter_expression(filters))
+    # Conversão sem cópia onde os tipos permitem; datas viram datetime64 em vez de objetos
+    return table.to_pandas(split_blocks=True, self_destruct=True, date_as_object=False)
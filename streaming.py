@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from datetime import date, timedelta
+from aggregates import combine_aggregates
+from config import STREAM_MIN_DAYS, STREAM_WINDOW_DAYS, STREAM_MAX_JOBS
+
+
+def _period(filters):
+    return date.fromisoformat(filters.start_date[:10]), date.fromisoformat(filters.end_date[:10])
+
+
+def should_stream(filters):
+    """Indica se o período é longo o bastante para ser carregado em janelas"""
+    if not (filters.start_date and filters.end_date):
+        return False
+    start, end = _period(filters)
+    return (end - start).days + 1 > STREAM_MIN_DAYS
+
+
+def date_windows(filters, days=STREAM_WINDOW_DAYS):
+    """Divide o período dos filtros em janelas consecutivas de até `days` dias"""
+    start, end = _period(filters)
+    windows = []
+    while start <= end:
+        stop = min(start + timedelta(days=days - 1), end)
+        windows.append(replace(filters, start_date=str(start), end_date=str(stop)))
+        start = stop + timedelta(days=1)
+    return windows
+
+
+class StreamingJob:
+    """Carregamento em andamento de um período longo"""
+
+    def __init__(self, key, filters, db_version):
+        self.key = key
+        self.filters = filters
+        self.db_version = db_version
+        self.windows = date_windows(filters)
+        self.completed = 0
+        self.aggregates = None
+        self.done = False
+        self.error = None
+        self.started = time.time()
+
+    @property
+    def progress(self):
+        return self.completed / len(self.windows) if self.windows else 1.0
+
+
+class StreamingLoader:
+    """Carrega períodos longos janela a janela, acumulando os agregados parciais
+
+    Cada janela é agregada separadamente (a memória de cada consulta depende
+    do tamanho da janela, não do período) e somada ao resultado acumulado,
+    que os gráficos podem exibir enquanto o carregamento continua. No final,
+    `on_complete(job)` recebe o resultado completo.
+    """
+
+    def __init__(self, load_aggregates, on_complete, max_jobs=STREAM_MAX_JOBS):
+        self.load_aggregates = load_aggregates
+        self.on_complete = on_complete
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, key, filters, db_version):
+        """Inicia o carregamento (se ainda não houver um para a mesma chave)"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.error is None:
+                return job
+            job = StreamingJob(key, filters, db_version)
+            self._jobs[key] = job
+            # Descarta os carregamentos mais antigos já concluídos
+            for old_key in list(self._jobs):
+                if len(self._jobs) <= self.max_jobs:
+                    break
+                if self._jobs[old_key].done:
+                    del self._jobs[old_key]
+        threading.Thread(target=self._run, args=(job,), name=f'carga-{key}', daemon=True).start()
+        return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _run(self, job):
+        try:
+            for window in job.windows:
+                part = self.load_aggregates(window)
+                aggregates = part if job.aggregates is None else combine_aggregates([job.aggregates, part])
+                with self._lock:
+                    job.aggregates = aggregates
+                    job.completed += 1
+            self.on_complete(job)
+            print(f"Período carregado em {len(job.windows)} janelas ({time.time() - job.started:.1f}s)")
+        except Exception as e:
+            print(f"Erro ao carregar o período em janelas: {str(e)}")
+            job.error = str(e)
+        finally:
+            job.done = True
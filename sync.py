@@ -0,0 +1,267 @@
+import os
+import random
+import shutil
+import sqlite3
+import threading
+import time
+from config import (
+    DB_PATH, ROLLUP_DB_PATH, TABLE_NAME, GOOGLE_DRIVE_FILE_ID, DOWNLOAD_FREQUENCY, DELTA_SYNC_URL,
+    SYNC_POLL_INTERVAL, SYNC_JITTER, SYNC_RETRY_MIN, SYNC_RETRY_MAX, SYNC_LOCK_PATH
+)
+from indexes import missing_indexes, prepare_database_indexes
+from rollups import refresh_rollups
+from snapshot import refresh_snapshot
+from colstore import refresh_colstore
+from delta import delta_download
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Arquivo temporário do download, no mesmo diretório para que os.replace seja atômico
+DOWNLOAD_TMP_PATH = DB_PATH + '.download'
+
+
+def verify_database_integrity(db_path=DB_PATH):
+    """Verifica se o arquivo é um banco de dados SQLite válido"""
+    try:
+        conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+        try:
+            cursor = conn.cursor()
+
+            # Verificar se a tabela DADOS existe
+            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name=?", (TABLE_NAME,))
+            if cursor.fetchone()[0] == 0:
+                return False
+
+            # Verificar se há registros na tabela
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
+            count = cursor.fetchone()[0]
+            print(f"Total de registros na tabela {TABLE_NAME}: {count}")
+        finally:
+            conn.close()
+        print("Verificação de integridade do banco de dados: OK")
+        return True
+
+    except Exception as e:
+        print(f"Erro ao verificar integridade do banco de dados: {str(e)}")
+        return False
+
+
+def _install_database(tmp_path):
+    """Cria os índices no arquivo temporário e o coloca no lugar do banco atual
+
+    O os.replace troca o arquivo de uma vez: consultas em andamento terminam
+    no arquivo antigo (que continua aberto) e as conexões de db.py passam
+    para o novo arquivo na próxima consulta.
+    """
+    prepare_database_indexes(tmp_path)
+    os.replace(tmp_path, DB_PATH)
+
+
+def refresh_derived_data():
+    """Atualiza as estruturas derivadas do banco (pré-agregados, colunas e, se ativado, o snapshot)"""
+    refresh_rollups(DB_PATH, ROLLUP_DB_PATH)
+    refresh_snapshot(DB_PATH)
+    refresh_colstore(DB_PATH)
+
+
+def fetch_database(target_path):
+    """Baixa a versão atual do banco para `target_path`
+
+    Com DELTA_SYNC_URL configurada e um banco local existente, baixa só os
+    blocos alterados; em caso de falha, baixa o arquivo inteiro pelo gdown.
+    Um `target_path` que sobrou de uma execução interrompida é apagado antes,
+    para que um download que falhe sem gravar nada não deixe o arquivo antigo
+    no lugar.
+    """
+    if os.path.exists(target_path):
+        os.remove(target_path)
+
+    if DELTA_SYNC_URL and os.path.exists(DB_PATH):
+        try:
+            delta_download(DB_PATH, target_path)
+            return
+        except Exception as e:
+            print(f"Sincronização por blocos falhou ({str(e)}). Baixando o arquivo inteiro...")
+            if os.path.exists(target_path):
+                os.remove(target_path)
+
+    # Instalar gdown se necessário
+    try:
+        import gdown
+        print("Biblioteca gdown já está instalada.")
+    except ImportError:
+        print("Instalando biblioteca gdown...")
+        os.system("pip install gdown")
+        import gdown
+
+    url = f'https://drive.google.com/uc?id={GOOGLE_DRIVE_FILE_ID}'
+    gdown.download(url, target_path, quiet=False)
+
+
+def download_database(on_new_database=None):
+    """Baixa o banco de dados do Google Drive sem interromper os leitores
+
+    O download vai para um arquivo temporário, que é verificado e indexado
+    antes de substituir o banco atual. `on_new_database` é chamado depois
+    que um novo arquivo entra em uso (por exemplo, para invalidar o cache).
+    """
+    try:
+        print("Verificando banco de dados...")
+
+        # Verificar se o arquivo já existe e se precisa ser baixado novamente
+        if os.path.exists(DB_PATH):
+            # Verificar a idade do arquivo
+            file_age = time.time() - os.path.getmtime(DB_PATH)
+
+            # DOWNLOAD_FREQUENCY = 0: só baixa quando o arquivo não existe
+            if DOWNLOAD_FREQUENCY == 0 or file_age < DOWNLOAD_FREQUENCY:
+                print(f"Usando banco de dados existente: {DB_PATH}")
+
+                # Verificar integridade do banco
+                if verify_database_integrity(DB_PATH):
+                    # Índices ausentes são criados em uma cópia, nunca no arquivo em uso
+                    if missing_indexes(DB_PATH):
+                        shutil.copy2(DB_PATH, DOWNLOAD_TMP_PATH)
+                        _install_database(DOWNLOAD_TMP_PATH)
+                    refresh_derived_data()
+                    return True
+                else:
+                    print("Banco de dados corrompido. Baixando novamente...")
+            else:
+                print(f"Banco de dados desatualizado. Baixando novamente...")
+        else:
+            print("Banco de dados não encontrado. Baixando...")
+
+        fetch_database(DOWNLOAD_TMP_PATH)
+
+        # Verificar se o download foi bem-sucedido antes de trocar o arquivo
+        if not os.path.exists(DOWNLOAD_TMP_PATH):
+            print("Erro ao baixar o banco de dados.")
+            return False
+        if not verify_database_integrity(DOWNLOAD_TMP_PATH):
+            print("Erro: O arquivo baixado não é um banco de dados SQLite válido.")
+            os.remove(DOWNLOAD_TMP_PATH)
+            return False
+
+        _install_database(DOWNLOAD_TMP_PATH)
+        print(f"Banco de dados baixado com sucesso: {DB_PATH}")
+        refresh_derived_data()
+        if on_new_database is not None:
+            on_new_database()
+        return True
+
+    except Exception as e:
+        print(f"Erro ao baixar o banco de dados: {str(e)}")
+        if os.path.exists(DOWNLOAD_TMP_PATH):
+            os.remove(DOWNLOAD_TMP_PATH)
+        return False
+
+
+def _file_identity(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class SyncScheduler:
+    """Mantém o banco de dados atualizado enquanto o servidor está no ar
+
+    Cada worker roda o seu agendador em uma thread. A cada SYNC_POLL_INTERVAL
+    segundos ele confere a idade do arquivo e, quando passa de
+    DOWNLOAD_FREQUENCY (mais uma folga aleatória), chama download_database.
+    Uma trava de arquivo (flock) garante que só um processo baixa por vez; os
+    demais passam a usar o novo arquivo assim que ele é trocado. Falhas são
+    repetidas com espera exponencial.
+
+    `on_new_database` é chamado no processo que baixou o arquivo;
+    `on_external_change`, nos demais processos quando percebem a troca
+    (útil para caches que não são compartilhados entre os workers).
+    """
+
+    def __init__(self, on_new_database=None, on_external_change=None,
+                 poll_interval=SYNC_POLL_INTERVAL, lock_path=SYNC_LOCK_PATH):
+        self.on_new_database = on_new_database
+        self.on_external_change = on_external_change
+        self.poll_interval = poll_interval
+        self.lock_path = lock_path
+        self.failures = 0
+        self.next_attempt = 0.0
+        self._started = False
+        self._identity = _file_identity(DB_PATH)
+        self._jitter = random.uniform(0, SYNC_JITTER) * DOWNLOAD_FREQUENCY
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due(self):
+        """Indica se o arquivo está ausente ou mais velho que DOWNLOAD_FREQUENCY"""
+        if not os.path.exists(DB_PATH):
+            return True
+        if DOWNLOAD_FREQUENCY == 0:
+            return False
+        return time.time() - os.path.getmtime(DB_PATH) >= DOWNLOAD_FREQUENCY + self._jitter
+
+    def _sync_once(self):
+        """Executa download_database se nenhum outro processo estiver baixando
+
+        Retorna None quando outro processo está com a trava.
+        """
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    print("Atualização do banco de dados em andamento em outro processo.")
+                    return None
+            return download_database(self.on_new_database)
+
+    def tick(self):
+        """Uma verificação do agendador"""
+        identity = _file_identity(DB_PATH)
+        if identity != self._identity and self._identity is not None and self.on_external_change is not None:
+            print("Banco de dados substituído por outro processo.")
+            self.on_external_change()
+        self._identity = identity
+
+        now = time.time()
+        # A primeira verificação sempre roda (índices e estruturas derivadas)
+        if now < self.next_attempt or (self._started and not self.due()):
+            return
+        self._started = True
+
+        result = self._sync_once()
+        if result is False:
+            self.failures += 1
+            delay = min(SYNC_RETRY_MIN * 2 ** (self.failures - 1), SYNC_RETRY_MAX)
+            delay *= 1 + random.uniform(-SYNC_JITTER, SYNC_JITTER)
+            self.next_attempt = now + delay
+            print(f"Falha ao atualizar o banco de dados ({self.failures}x). Nova tentativa em {delay:.0f}s")
+        elif result:
+            self.failures = 0
+        # A troca feita por este processo já foi tratada por on_new_database
+        self._identity = _file_identity(DB_PATH)
+
+    def _run(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Erro no agendador de atualização do banco de dados: {str(e)}")
+            if self._stop.wait(self.poll_interval):
+                return
+
+    def start(self):
+        """Inicia o agendador em uma thread, sem bloquear a inicialização do servidor"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='agendador-banco', daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Interrompe o agendador"""
+        self._stop.set()
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Módulos da raiz do projeto e o gerador de dados sintéticos dos benchmarks
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from synthetic import create_synthetic_database
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    """Banco DADOS sintético pequeno: uma máquina por minuto, de 25/01 a meados de fevereiro"""
+    path = str(tmp_path / 'dstechBD.db')
+    create_synthetic_database(path, 30000, machines=2, lines=2, start='2024-01-25')
+    return path
@@ -0,0 +1,219 @@
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+from aggregates import DashboardFilters, detail_conditions, query_aggregates, query_detail_rows, query_detail_count
+from backends import SQLITE, Backend, ConnectionPool, ServerBackend, PostgreSQLBackend, SQLServerBackend
+from config import MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD
+
+
+class PyformatCursor:
+    """Cursor que aceita o estilo de parâmetro %s (pymysql, psycopg2) sobre o sqlite3"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        # Como nos drivers com paramstyle 'format': %s é o parâmetro e %% um % literal
+        return self._cursor.execute(query.replace('%s', '?').replace('%%', '%'), params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PyformatConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return PyformatCursor(self._conn.cursor())
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class StandInBackend(ServerBackend):
+    """Banco "em servidor" simulado: ConnectionPool de conexões sqlite3 com marcador %s"""
+
+    name = 'teste'
+
+    def day_expr(self, column):
+        # %% como no MySQL, para conferir o marcador escapado
+        return f"strftime('%%Y-%%m-%%d', {column})"
+
+    def hour_expr(self, column):
+        return f"CAST(substr({column}, 1, 2) AS INTEGER)"
+
+    def text_expr(self, column):
+        # Conversão explícita, como no PostgreSQL
+        return f"CAST({column} AS TEXT)"
+
+    def connect(self):
+        return PyformatConnection(sqlite3.connect(self.settings['path'], check_same_thread=False))
+
+
+FILTERS = [
+    DashboardFilters('2024-01-27', '2024-02-08'),
+    DashboardFilters('2024-01-25', '2024-02-20', machine='2', efficiency='high'),
+    DashboardFilters('2024-01-30', '2024-02-02', client='1', utilization='low'),
+]
+
+
+@pytest.fixture
+def stand_in(source_db):
+    backend = StandInBackend({'path': source_db})
+    yield backend
+    # Fecha as conexões ociosas do pool
+    with backend.pool._condition:
+        backend.pool._reap(float('inf'))
+
+
+def sorted_groups(aggregates):
+    groups = aggregates.groups
+    return groups.sort_values(['dia', 'hora', MACHINE_FIELD, CLIENT_FIELD]).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_aggregates_match_sqlite(source_db, stand_in, filters):
+    expected = query_aggregates(sqlite3.connect(source_db), filters)
+    with stand_in.connection() as conn:
+        result = query_aggregates(conn, filters, stand_in)
+
+    pd.testing.assert_frame_equal(sorted_groups(result), sorted_groups(expected))
+
+
+@pytest.mark.parametrize('page, sort_by, filter_query', [
+    (0, None, None),
+    (3, [{'column_id': PIECES_IN_FIELD, 'direction': 'desc'}], None),
+    (1, [{'column_id': MACHINE_FIELD, 'direction': 'asc'}], '{DATA} contains 01-2 && {LINHA} = 2'),
+    (0, None, '{DATA} datestartswith 2024-02 && {PECAS_TOT_SAI} >= 30'),
+    (0, None, '{PECAS_TOT_SAI} contains 3 && {HORA} contains :1'),
+])
+def test_detail_rows_match_sqlite(source_db, stand_in, page, sort_by, filter_query):
+    filters = FILTERS[0]
+    conn = sqlite3.connect(source_db)
+    expected = query_detail_rows(conn, filters, page, 10, sort_by, filter_query)
+    expected_count = query_detail_count(conn, filters, filter_query)
+    with stand_in.connection() as server:
+        result = query_detail_rows(server, filters, page, 10, sort_by, filter_query, stand_in)
+        count = query_detail_count(server, filters, filter_query, stand_in)
+
+    assert len(result) == 10
+    pd.testing.assert_frame_equal(result, expected)
+    assert count == expected_count
+
+
+def test_connections_are_pooled(stand_in):
+    for filters in FILTERS:
+        with stand_in.connection() as conn:
+            query_aggregates(conn, filters, stand_in)
+
+    stats = stand_in.stats()
+    assert stats['backend'] == 'teste'
+    assert stats['aquisicoes'] == len(FILTERS)
+    assert stats['abertas'] == 1 and stats['ociosas'] == 1
+
+
+def test_page_query_syntax():
+    query, params = Backend.page_query(SQLITE, 'A, B', 'T WHERE A = ?', 'A ASC', [1], 10, 20)
+    assert query == "SELECT A, B FROM T WHERE A = ? ORDER BY A ASC LIMIT ? OFFSET ?"
+    assert params == [1, 10, 20]
+
+    server = StandInBackend({'path': ':memory:'})
+    query, params = server.page_query('A', 'T WHERE A = %s', 'A ASC', [1], 10, 20)
+    assert query == "SELECT A FROM T WHERE A = %s ORDER BY A ASC LIMIT %s OFFSET %s"
+    assert params == [1, 10, 20]
+
+    sqlserver = SQLServerBackend({})
+    query, params = sqlserver.page_query('A', 'T WHERE A = ?', 'A ASC', [1], 10, 20)
+    assert query == "SELECT A FROM T WHERE A = ? ORDER BY A ASC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+    assert params == [1, 20, 10]
+
+
+def test_text_filters_cast_on_postgresql():
+    postgresql = PostgreSQLBackend({})
+    where, params = detail_conditions(FILTERS[0], '{PECAS_TOT_SAI} contains 3 && {DATA} datestartswith 2024-02', postgresql)
+    assert "CAST(PECAS_TOT_SAI AS TEXT) LIKE %s" in where
+    assert "to_char(DATA, 'YYYY-MM-DD') LIKE %s" in where
+    assert params[-2:] == ['%3%', '2024-02%']
+
+
+class FakeConnection:
+    """Conexão que pode "cair" (o ping falha) e registra se foi fechada"""
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def cursor(self):
+        if not self.alive:
+            raise sqlite3.OperationalError("servidor indisponível")
+        return sqlite3.connect(':memory:').cursor()
+
+    def close(self):
+        self.closed = True
+
+
+def test_idle_connections_are_reaped_without_traffic():
+    pool = ConnectionPool(FakeConnection, size=2, max_idle=1, max_lifetime=60)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    time.sleep(2.5)
+    assert conn.closed
+    assert pool.stats()['ociosas'] == 0 and pool.stats()['abertas'] == 0
+    assert pool.stats()['fechadas']['ociosa'] == 1
+
+
+def test_release_reaps_expired_idle_connections():
+    pool = ConnectionPool(FakeConnection, size=2, max_idle=60, max_lifetime=60)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool._idle[0] = (first, pool._idle[0][1], time.time() - 120)
+
+    pool.release(second)
+    assert first.closed and not second.closed
+    assert pool.stats()['ociosas'] == 1
+
+
+def test_failed_ping_retries_without_recursion():
+    opened = []
+
+    def factory():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(factory, size=3, slow_acquire=60)
+    connections = [pool.acquire() for _ in range(3)]
+    for conn in connections:
+        pool.release(conn)
+        conn.alive = False
+
+    conn = pool.acquire()
+    assert conn is opened[-1] and len(opened) == 4
+    assert all(c.closed for c in connections)
+    stats = pool.stats()
+    assert stats['fechadas']['falha_ping'] == 3
+    assert stats['aquisicoes'] == 4 and stats['esperas'] == 0
+
+
+def test_server_down_raises_after_discarding_dead_connections():
+    state = {'up': True}
+
+    def factory():
+        if not state['up']:
+            raise sqlite3.OperationalError("servidor indisponível")
+        return FakeConnection()
+
+    pool = ConnectionPool(factory, size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False
+    state['up'] = False
+
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+    assert pool.stats()['abertas'] == 0
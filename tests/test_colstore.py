@@ -0,0 +1,37 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+from aggregates import DashboardAggregates, DashboardFilters, query_aggregates
+from colstore import colstore_current, colstore_groups, export_colstore
+from config import MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD
+
+
+@pytest.fixture
+def store_dir(source_db, tmp_path):
+    path = str(tmp_path / 'colunas')
+    export_colstore(source_db, path)
+    return path
+
+
+@pytest.mark.parametrize('filters', [
+    DashboardFilters('2024-01-27', '2024-02-08'),
+    DashboardFilters('2024-01-27', '2024-02-08', efficiency='high'),
+    DashboardFilters('2024-01-25', '2024-02-20', machine='2', utilization='low'),
+    DashboardFilters('2024-01-30', '2024-02-02', client='1', efficiency='medium', utilization='medium'),
+])
+def test_colstore_matches_sql(source_db, store_dir, filters):
+    assert colstore_current(source_db, store_dir)
+    expected = query_aggregates(sqlite3.connect(source_db), filters)
+    result = DashboardAggregates(colstore_groups(filters, store_dir))
+
+    assert result.totals['pecas_entrada'] == expected.totals['pecas_entrada']
+    assert result.totals['pecas_saida'] == expected.totals['pecas_saida']
+    assert result.totals['dias'] == expected.totals['dias']
+    np.testing.assert_allclose(result.totals['ef_entrada'], expected.totals['ef_entrada'])
+    for rollup, key in ((result.by_machine, MACHINE_FIELD), (result.by_client, CLIENT_FIELD)):
+        other = expected.by_machine if key == MACHINE_FIELD else expected.by_client
+        merged = rollup.merge(other, on=key, suffixes=('', '_sql'))
+        assert len(merged) == len(other)
+        np.testing.assert_allclose(merged[PIECES_IN_FIELD], merged[f'{PIECES_IN_FIELD}_sql'])
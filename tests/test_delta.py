@@ -0,0 +1,104 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+import delta
+from delta import block_hashes, build_manifest, delta_download, file_sha256
+from config import TABLE_NAME, PIECES_IN_FIELD
+
+# Blocos pequenos (uma página do SQLite) para que as mudanças caiam em poucos blocos
+BLOCK_SIZE = 4096
+
+
+@pytest.fixture
+def origin(source_db, tmp_path):
+    """Cópia local (baixada antes) e a origem publicada como URL file://, com o manifesto ao lado"""
+    local = str(tmp_path / 'local.db')
+    shutil.copyfile(source_db, local)
+
+    def publish():
+        with open(source_db + '.manifest.json', 'w') as f:
+            json.dump(build_manifest(source_db, BLOCK_SIZE), f)
+        return f'file://{source_db}'
+
+    return local, publish
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """Intervalos de bytes lidos da origem (sem contar o manifesto)"""
+    ranges = []
+    read_url = delta._read_url
+
+    def spy(url, start=None, end=None):
+        if start is not None:
+            ranges.append((start, end))
+        return read_url(url, start, end)
+
+    monkeypatch.setattr(delta, '_read_url', spy)
+    return ranges
+
+
+def changed_blocks(local, source):
+    old, new = block_hashes(local, BLOCK_SIZE), block_hashes(source, BLOCK_SIZE)
+    return {i for i, h in enumerate(new) if i >= len(old) or old[i] != h}
+
+
+def fetched_blocks(ranges):
+    return {block for start, end in ranges for block in range(start // BLOCK_SIZE, -(-end // BLOCK_SIZE))}
+
+
+def modify(path, statements):
+    conn = sqlite3.connect(path)
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+
+
+def test_only_changed_blocks_are_fetched(source_db, origin, fetched, tmp_path):
+    local, publish = origin
+    modify(source_db, [
+        f"INSERT INTO {TABLE_NAME} SELECT * FROM {TABLE_NAME} WHERE rowid > 29500",
+        f"UPDATE {TABLE_NAME} SET {PIECES_IN_FIELD} = {PIECES_IN_FIELD} + 1 WHERE rowid = 100",
+    ])
+    url = publish()
+    target = str(tmp_path / 'novo.db')
+
+    downloaded = delta_download(local, target, url=url)
+
+    expected = changed_blocks(local, source_db)
+    assert expected and len(expected) < len(block_hashes(source_db, BLOCK_SIZE)) / 4
+    assert fetched_blocks(fetched) == expected
+    assert downloaded == sum(end - start for start, end in fetched)
+    assert file_sha256(target) == file_sha256(source_db)
+    conn = sqlite3.connect(target)
+    assert conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0] == 30500
+    conn.close()
+
+
+def test_unchanged_source_fetches_nothing(source_db, origin, fetched, tmp_path):
+    local, publish = origin
+    target = str(tmp_path / 'novo.db')
+
+    assert delta_download(local, target, url=publish()) == 0
+    assert fetched == []
+    assert file_sha256(target) == file_sha256(source_db)
+
+
+def test_mismatched_checksum_is_rejected(source_db, origin, tmp_path):
+    local, publish = origin
+    modify(source_db, [f"DELETE FROM {TABLE_NAME} WHERE rowid < 50"])
+    url = publish()
+    with open(source_db + '.manifest.json') as f:
+        manifest = json.load(f)
+    manifest['sha256'] = '0' * 64
+    with open(source_db + '.manifest.json', 'w') as f:
+        json.dump(manifest, f)
+    target = tmp_path / 'novo.db'
+
+    with pytest.raises(ValueError):
+        delta_download(local, str(target), url=url)
+    assert not target.exists()
@@ -0,0 +1,35 @@
+import sqlite3
+
+from aggregates import DashboardFilters, query_detail_rows
+from config import TABLE_NAME, DATE_FIELD, MACHINE_FIELD
+from indexes import DASHBOARD_INDEXES, OBSOLETE_INDEXES, check_query_plans, create_indexes, missing_indexes
+
+
+def test_dashboard_queries_use_indexes(source_db):
+    conn = sqlite3.connect(source_db)
+    conn.execute(f"CREATE INDEX {OBSOLETE_INDEXES[0]} ON {TABLE_NAME} ({DATE_FIELD}, {MACHINE_FIELD})")
+    conn.commit()
+    conn.close()
+
+    assert create_indexes(source_db) == list(DASHBOARD_INDEXES)
+    assert missing_indexes(source_db) == []
+    # Nenhuma consulta percorre a tabela nem ordena as linhas filtradas a cada página
+    assert check_query_plans(source_db) == []
+
+    conn = sqlite3.connect(source_db)
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert not names & set(OBSOLETE_INDEXES)
+
+
+def test_detail_page_follows_default_order(source_db):
+    create_indexes(source_db)
+    conn = sqlite3.connect(source_db)
+    filters = DashboardFilters('2024-01-27', '2024-02-08', efficiency='high')
+
+    first = query_detail_rows(conn, filters, page=0, page_size=50)
+    second = query_detail_rows(conn, filters, page=1, page_size=50)
+    rows = list(first.itertuples(index=False)) + list(second.itertuples(index=False))
+
+    keys = [tuple(row[:4]) for row in rows]
+    assert len(rows) == 100
+    assert keys == sorted(keys)
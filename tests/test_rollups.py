@@ -0,0 +1,72 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+from rollups import DAILY_TABLE, HOURLY_TABLE, build_rollups, update_rollups
+from config import TABLE_NAME, MACHINE_FIELD, CLIENT_FIELD, PIECES_IN_FIELD, EFFICIENCY_IN_FIELD
+
+
+def read_table(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    finally:
+        conn.close()
+    keys = [c for c in ('dia', 'hora', MACHINE_FIELD, CLIENT_FIELD) if c in df]
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+def assert_same_rollups(path, expected_path):
+    for table in (HOURLY_TABLE, DAILY_TABLE):
+        pd.testing.assert_frame_equal(read_table(path, table), read_table(expected_path, table), check_exact=False)
+
+
+def modify_source(db_path, statements):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+    # Garante uma assinatura (tamanho, mtime) diferente da gravada nos metadados
+    stat = os.stat(db_path)
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_incremental_update_merges_new_rows(source_db, tmp_path):
+    rollup_path = str(tmp_path / 'rollups.db')
+    build_rollups(source_db, rollup_path)
+    modify_source(source_db, [
+        f"INSERT INTO {TABLE_NAME} SELECT * FROM {TABLE_NAME} WHERE rowid > 29000"
+    ])
+
+    assert update_rollups(source_db, rollup_path)
+    build_rollups(source_db, str(tmp_path / 'esperado.db'))
+    assert_same_rollups(rollup_path, str(tmp_path / 'esperado.db'))
+
+
+def test_incremental_update_rebuilds_edited_old_months(source_db, tmp_path):
+    rollup_path = str(tmp_path / 'rollups.db')
+    build_rollups(source_db, rollup_path)
+    # Registros antigos (janeiro) editados e removidos, mais registros novos
+    modify_source(source_db, [
+        f"UPDATE {TABLE_NAME} SET {PIECES_IN_FIELD} = {PIECES_IN_FIELD} + 7, {EFFICIENCY_IN_FIELD} = 1.5 WHERE rowid = 5",
+        f"UPDATE {TABLE_NAME} SET {MACHINE_FIELD} = 2 WHERE rowid = 8",
+        f"DELETE FROM {TABLE_NAME} WHERE rowid = 10",
+        f"INSERT INTO {TABLE_NAME} SELECT * FROM {TABLE_NAME} WHERE rowid > 29900",
+    ])
+
+    assert update_rollups(source_db, rollup_path)
+    build_rollups(source_db, str(tmp_path / 'esperado.db'))
+    assert_same_rollups(rollup_path, str(tmp_path / 'esperado.db'))
+
+
+def test_incremental_update_drops_removed_months(source_db, tmp_path):
+    rollup_path = str(tmp_path / 'rollups.db')
+    build_rollups(source_db, rollup_path)
+    modify_source(source_db, [f"DELETE FROM {TABLE_NAME} WHERE DATA < '2024-02-01'"])
+
+    assert update_rollups(source_db, rollup_path)
+    assert read_table(rollup_path, DAILY_TABLE)['dia'].min() >= '2024-02-01'
+    build_rollups(source_db, str(tmp_path / 'esperado.db'))
+    assert_same_rollups(rollup_path, str(tmp_path / 'esperado.db'))
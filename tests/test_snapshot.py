@@ -0,0 +1,25 @@
+import sqlite3
+
+import pytest
+
+from aggregates import DashboardAggregates, DashboardFilters, FRAME_COLUMNS, aggregate_frame, query_aggregates
+from snapshot import export_snapshot, read_snapshot, snapshot_current
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('filters', [
+    DashboardFilters('2024-01-27', '2024-02-08'),
+    DashboardFilters('2024-01-25', '2024-02-20', machine='2', efficiency='high'),
+])
+def test_snapshot_matches_sql(source_db, tmp_path, filters):
+    snapshot_dir = str(tmp_path / 'snapshot')
+    export_snapshot(source_db, snapshot_dir)
+    assert snapshot_current(source_db, snapshot_dir)
+
+    expected = query_aggregates(sqlite3.connect(source_db), filters)
+    result = DashboardAggregates(aggregate_frame(read_snapshot(filters, FRAME_COLUMNS, snapshot_dir)))
+
+    assert result.totals['pecas_entrada'] == expected.totals['pecas_entrada']
+    assert result.totals['pecas_saida'] == expected.totals['pecas_saida']
+    assert len(result.groups) == len(expected.groups)
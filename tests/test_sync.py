@@ -0,0 +1,18 @@
+import sys
+import types
+
+import sync
+
+
+def test_fetch_removes_stale_download(tmp_path, monkeypatch):
+    # Sobra de uma execução interrompida; o gdown falha sem gravar nada
+    target = tmp_path / 'dstechBD.db.download'
+    target.write_bytes(b'download parcial')
+    calls = []
+    monkeypatch.setitem(sys.modules, 'gdown', types.SimpleNamespace(download=lambda *args, **kwargs: calls.append(args)))
+    monkeypatch.setattr(sync, 'DELTA_SYNC_URL', None)
+
+    sync.fetch_database(str(target))
+
+    assert calls
+    assert not target.exists()
@@ -0,0 +1,30 @@
+import os
+import sqlite3
+
+from colstore import COLSTORE_FORMAT, colstore_current, export_colstore
+from config import TABLE_NAME, PIECES_IN_FIELD
+from versions import CURRENT_FILE, current_version, version_name
+
+
+def test_new_version_replaces_previous(source_db, tmp_path):
+    store_dir = str(tmp_path / 'colunas')
+    export_colstore(source_db, store_dir)
+    first = current_version(store_dir)
+
+    conn = sqlite3.connect(source_db)
+    conn.execute(f"UPDATE {TABLE_NAME} SET {PIECES_IN_FIELD} = {PIECES_IN_FIELD} + 1 WHERE rowid = 1")
+    conn.commit()
+    conn.close()
+    assert not colstore_current(source_db, store_dir)
+
+    # Restos de uma exportação interrompida da mesma versão são descartados
+    leftover = os.path.join(store_dir, version_name(source_db, COLSTORE_FORMAT))
+    os.makedirs(leftover)
+    open(os.path.join(leftover, 'parcial.npy'), 'w').close()
+
+    export_colstore(source_db, store_dir)
+    second = current_version(store_dir)
+    assert second != first
+    assert colstore_current(source_db, store_dir)
+    assert sorted(os.listdir(store_dir)) == sorted([CURRENT_FILE, second])
+    assert 'parcial.npy' not in os.listdir(os.path.join(store_dir, second))
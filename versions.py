@@ -0,0 +1,54 @@
+import os
+import shutil
+from rollups import source_signature
+
+# Arquivo com o nome da versão em uso, dentro do diretório base
+CURRENT_FILE = 'ATUAL'
+VERSION_PREFIX = 'versao-'
+
+
+def version_name(db_path, data_format):
+    """Nome do diretório da versão: formato dos dados + assinatura do arquivo de origem"""
+    return f'{VERSION_PREFIX}{data_format}-' + source_signature(db_path).replace(':', '-')
+
+
+def current_version(base_dir):
+    """Versão apontada pelo arquivo ATUAL (None se ainda não houver)"""
+    try:
+        with open(os.path.join(base_dir, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def version_current(base_dir, db_path, data_format):
+    """Verifica se a versão em uso corresponde ao arquivo de origem e ao formato atuais"""
+    if not os.path.exists(db_path):
+        return False
+    version = current_version(base_dir)
+    return version == version_name(db_path, data_format) and os.path.isdir(os.path.join(base_dir, version))
+
+
+def new_version_dir(base_dir, version):
+    """Caminho de uma nova versão, sem restos de uma exportação interrompida"""
+    target = os.path.join(base_dir, version)
+    os.makedirs(base_dir, exist_ok=True)
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    return target
+
+
+def publish_version(base_dir, version):
+    """Passa a usar `version` e remove as anteriores
+
+    O arquivo ATUAL é trocado de uma vez (os.replace), de modo que os
+    leitores nunca veem uma versão pela metade.
+    """
+    tmp_file = os.path.join(base_dir, CURRENT_FILE + '.tmp')
+    with open(tmp_file, 'w') as f:
+        f.write(version)
+    os.replace(tmp_file, os.path.join(base_dir, CURRENT_FILE))
+
+    for name in os.listdir(base_dir):
+        if name.startswith(VERSION_PREFIX) and name != version:
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)